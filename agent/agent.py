@@ -1,21 +1,33 @@
 #!/usr/bin/env python3
 # agent/agent.py
+import asyncio
 import time
-import subprocess
-import shlex
+import socket
 import sys
 import os
 import signal
 import logging
 from pathlib import Path
-import threading
+from collections import deque
 from datetime import datetime
 
-from db import init_db, insert_event, update_last_event_duration
+import metrics
+from collectors import COLLECTOR_TIME, CollectorHub, register
+from db import DB_PATH, init_db, clear_open_intervals
+from procinfo import process_detail
+from shell_ingest import HISTORY_PATH, import_history, parse_line, start_servers
+from writer import get_writer
+from x11_collector import X11Collector
 
 # Config
-POLL_SEC = 5
+POLL_SEC = 5          # intervalo inicial
+POLL_MIN_SEC = 1      # piso: logo após troca de janela ou volta do ócio
+POLL_MAX_SEC = 60     # teto: ocioso ou janela estável há muito tempo
+POLL_BACKOFF = 1.5    # fator de crescimento do intervalo a cada poll sem mudança
+SCHEDULER_LOG_SEC = 3600  # frequência do log de wakeups/hora
+METRICS_SEC = 300     # frequência do resumo de métricas no log e do snapshot para a API
 IDLE_THRESHOLD = 60  # segundos para considerar idle
+HEARTBEAT_SEC = 300  # checkpoint da duração do intervalo aberto
 
 # Setup logging
 LOG_DIR = Path.home() / ".activity_tracker"
@@ -29,154 +41,381 @@ logging.basicConfig(
     ]
 )
 
+LOOP_TIME = metrics.histogram("agent_loop_seconds", "Processamento de cada amostra do stream no agente")
 
-def get_active_window_title():
+# Campos de `getwindowgeometry --shell`, nesta ordem
+_GEOMETRY_FIELDS = ("WINDOW", "X", "Y", "WIDTH", "HEIGHT", "SCREEN")
+
+
+def parse_xdotool_window(out):
+    """
+    Saída de `xdotool getactivewindow getwindowgeometry --shell getwindowname
+    getwindowpid` -> (título, pid, window id), ou None sem título
     """
-    Detecta janela ativa. Tenta X11 primeiro, depois Wayland.
+    lines = out.split("\n")
+    window_id = None
+    i = 0
+    # Só os campos do --shell, que terminam em SCREEN=: um título como
+    # "TODO=fix" ou "README=notes" vem depois e não é consumido
+    while i < len(lines):
+        key, sep, value = lines[i].partition("=")
+        if not sep or key not in _GEOMETRY_FIELDS:
+            break
+        if key == "WINDOW":
+            window_id = int(value) if value.isdigit() else None
+        i += 1
+        if key == "SCREEN":
+            break
+    title = lines[i].strip() if i < len(lines) else ""
+    pid = lines[i + 1].strip() if i + 1 < len(lines) else ""
+    if not title:
+        return None
+    return title, int(pid) if pid.isdigit() else None, window_id
+
+
+async def get_active_window(ctx):
+    """
+    Detecta a janela ativa numa única chamada: (título, pid, window id).
+    Tenta xdotool primeiro, depois wmctrl.
     Requer: sudo apt install xdotool wmctrl (X11) ou ydotool (Wayland)
     """
-    # Tenta X11
-    try:
-        p = subprocess.run(
-            shlex.split("xdotool getactivewindow getwindowname"),
-            capture_output=True, text=True, timeout=1, check=False
-        )
-        if p.returncode == 0:
-            title = p.stdout.strip()
-            if title:
-                return title
-    except Exception as e:
-        logging.debug(f"X11 window detection failed: {e}")
+    # Tenta X11: geometria (--shell traz WINDOW=id), nome e pid encadeados.
+    # getwindowpid falha em janelas sem _NET_WM_PID, por isso vem por último
+    out = await ctx.run(
+        ["xdotool", "getactivewindow", "getwindowgeometry", "--shell", "getwindowname", "getwindowpid"],
+        check=False
+    )
+    window = parse_xdotool_window(out) if out else None
+    if window:
+        return window
     
-    # Fallback: tenta wmctrl
-    try:
-        p = subprocess.run(
-            shlex.split("wmctrl -l"),
-            capture_output=True, text=True, timeout=1, check=False
-        )
-        if p.returncode == 0:
-            lines = p.stdout.strip().split('\n')
-            if lines:
-                # pega última linha (geralmente a janela ativa)
-                parts = lines[-1].split(None, 3)
-                if len(parts) >= 4:
-                    return parts[3]
-    except Exception as e:
-        logging.debug(f"wmctrl detection failed: {e}")
+    # Fallback: tenta wmctrl (-p inclui o pid)
+    out = await ctx.run(["wmctrl", "-lp"])
+    if out:
+        lines = out.strip().split('\n')
+        # pega última linha (geralmente a janela ativa)
+        parts = lines[-1].split(None, 4)
+        if len(parts) >= 5:
+            pid = int(parts[2]) if parts[2].isdigit() and parts[2] != "0" else None
+            return parts[4], pid, int(parts[0], 16)
     
     # Para Wayland seria necessário usar gdbus ou ferramentas específicas
     # Mas isso varia por compositor (GNOME Shell, Sway, etc.)
     
-    return "unknown"
+    return "unknown", None, None
+
 
-def get_active_window_pid():
-    """Obtém PID da janela ativa (X11 apenas)"""
+async def get_idle_seconds_x11(ctx):
+    """
+    Usa xprintidle (milliseconds). sudo apt install xprintidle
+    """
+    out = await ctx.run(["xprintidle"])
     try:
-        p = subprocess.run(
-            shlex.split("xdotool getactivewindow getwindowpid"),
-            capture_output=True, text=True, timeout=1, check=False
-        )
-        if p.returncode == 0:
-            pid = p.stdout.strip()
-            return int(pid) if pid else None
-    except Exception:
-        pass
-    return None
+        return int(out.strip()) / 1000.0 if out else 0
+    except ValueError:
+        return 0
+
+
+def _x11(ctx):
+    # Uma conexão X11 compartilhada por ócio e janela; None usa xdotool/xprintidle
+    hub = ctx.hub
+
+    def on_change(ts, title, pid, window_id):
+        # Thread do X11: cada troca entra no stream com o ts em que aconteceu
+        hub.emit_threadsafe("window", "window", (title, pid, window_id), ts=ts)
 
+    def create():
+        x11 = X11Collector.create(on_change)
+        if x11:
+            x11.start()
+            logging.info("Using native X11 collector")
+        return x11
+    return hub.shared("x11", create)
 
-def get_idle_seconds_x11():
+
+class AdaptiveScheduler:
     """
-    Usa xprintidle (milliseconds). sudo apt install xprintidle
+    Decide quanto dormir até o próximo poll de um coletor. Volta ao piso quando algo
+    muda (troca de janela, fim do ócio) e cresce exponencialmente até o teto
+    enquanto nada acontece. Com entrada recente do usuário (active=True) o
+    intervalo não passa do inicial: uma troca de janela pode vir a qualquer
+    momento. Fora do ócio, nunca dorme além do momento em que IDLE_THRESHOLD
+    seria atingido, para não atrasar a detecção de ócio.
     """
+
+    def __init__(self, name, floor=POLL_MIN_SEC, ceiling=POLL_MAX_SEC, backoff=POLL_BACKOFF, initial=POLL_SEC):
+        self.name = name
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoff = backoff
+        self.initial = min(max(initial, floor), ceiling)
+        self.interval = self.initial
+        self._wakeups = deque()
+        self._last_log = time.monotonic()
+
+    def next_interval(self, changed, idle=None, active=False):
+        """Registra um wakeup e devolve o intervalo até o próximo"""
+        now = time.monotonic()
+        self._wakeups.append(now)
+        while self._wakeups and self._wakeups[0] < now - 3600:
+            self._wakeups.popleft()
+
+        if changed:
+            self.interval = self.floor
+        else:
+            self.interval = min(self.interval * self.backoff, self.ceiling)
+            if active:
+                self.interval = min(self.interval, self.initial)
+
+        sleep = self.interval
+        if idle is not None and idle < IDLE_THRESHOLD:
+            sleep = min(sleep, max(self.floor, IDLE_THRESHOLD - idle))
+
+        if now - self._last_log >= SCHEDULER_LOG_SEC:
+            logging.info(
+                f"Scheduler[{self.name}]: {self.wakeups_per_hour()} wakeups/hour, "
+                f"interval {self.interval:.1f}s"
+            )
+            self._last_log = now
+        return sleep
+
+    def wakeups_per_hour(self):
+        """Wakeups na última hora"""
+        return len(self._wakeups)
+
+
+
+async def _idle_seconds(ctx, x11):
+    if x11 and x11.alive:
+        return await ctx.call(x11.idle_seconds, source="x11_screensaver")
+    return await get_idle_seconds_x11(ctx)
+
+
+@register("idle")
+async def idle_collector(ctx):
+    """Publica "idle" ao cruzar IDLE_THRESHOLD e "active" na volta"""
+    x11 = _x11(ctx)
+    scheduler = AdaptiveScheduler("idle")
+    was_idle = None
+    while not ctx.stopping:
+        idle = await _idle_seconds(ctx, x11)
+        is_idle = idle >= IDLE_THRESHOLD
+        changed = is_idle != was_idle
+        if changed and is_idle:
+            await ctx.emit("idle", int(idle))
+        elif changed and was_idle is not None:
+            # Com o poll espaçado no ócio, a volta é detectada até POLL_MAX_SEC
+            # depois; o ócio atual diz quando a entrada de fato voltou
+            await ctx.emit("active", int(idle), ts=time.time() - idle)
+        was_idle = is_idle
+        if not await ctx.sleep(scheduler.next_interval(changed, idle)):
+            break
+
+
+@register("window")
+async def window_collector(ctx):
+    """Publica "window" (título, pid, window id) a cada troca de foco ou título"""
+    x11 = _x11(ctx)
+    if x11:
+        # Trocas chegam por evento pelo callback; aqui só vigia a thread
+        while await ctx.sleep(POLL_MAX_SEC):
+            if not x11.alive:
+                logging.warning("X11 collector stopped, falling back to xdotool")
+                break
+        else:
+            return
+
+    scheduler = AdaptiveScheduler("window")
+    last = None
+    slept = scheduler.interval
+    while not ctx.stopping:
+        window = await get_active_window(ctx)
+        changed = window != last
+        if changed:
+            await ctx.emit("window", window)
+            last = window
+        # Entrada desde o último poll: o usuário está ativo e pode trocar de
+        # janela logo, então o intervalo não cresce além do inicial
+        active = await _idle_seconds(ctx, x11) < slept
+        slept = scheduler.next_interval(changed, active=active)
+        if not await ctx.sleep(slept):
+            break
+
+
+@register("shell_ingest")
+async def shell_ingest_collector(ctx):
+    """
+    Comandos do hook do shell via socket Unix local. Antes de abrir o
+    socket, importa o que ficou no term_history.log (offset salvo).
+    """
+    imported = await ctx.call(import_history, source="history_import", timeout=None)
+    if imported:
+        logging.info(f"Imported {imported} commands from {HISTORY_PATH}")
+
+    host = socket.gethostname()
+
+    def publish(data):
+        for line in data.decode("utf-8", "replace").splitlines():
+            parsed = parse_line(line, host)
+            if parsed:
+                ts, cmd_host, cmd = parsed
+                ctx.emit_nowait("command", (cmd_host, cmd), ts=ts)
+
+    close = await start_servers(publish)
     try:
-        p = subprocess.run(
-            shlex.split("xprintidle"),
-            capture_output=True, text=True, timeout=1, check=False
+        while await ctx.sleep(POLL_MAX_SEC):
+            pass
+    finally:
+        await close()
+
+
+class IntervalTracker:
+    """
+    Mantém em memória o intervalo aberto (janela focada ou ocioso).
+    A duração só é gravada ao fechar, a cada HEARTBEAT_SEC ou no shutdown;
+    leitores derivam o "até agora" do ts de início (view events_live).
+    """
+
+    def __init__(self, writer, heartbeat=HEARTBEAT_SEC):
+        self.writer = writer
+        self.heartbeat = heartbeat
+        self.key = None
+        self.title = None
+        self.event = None
+        self.start_ts = None
+        self.checkpoint_ts = None
+
+    def open(self, ts, key, typ, title, detail):
+        self.close(ts)
+        self.event = self.writer.insert(
+            ts, typ, title=title, detail=detail, duration=0,
+            open_until=ts + 2 * self.heartbeat
         )
-        if p.returncode == 0:
-            ms = int(p.stdout.strip())
-            return ms / 1000.0
-    except Exception as e:
-        logging.debug(f"xprintidle failed: {e}")
-    return 0
-
-stop_flag = False
-last_event_id = None
-
-def signal_handler(sig, frame):
-    global stop_flag
+        self.key = key
+        self.title = title
+        self.start_ts = ts
+        self.checkpoint_ts = ts
+
+    def tick(self, ts):
+        """Checkpoint grosso da duração enquanto o intervalo continua aberto"""
+        if self.event and ts - self.checkpoint_ts >= self.heartbeat:
+            self.writer.checkpoint(self.event, ts - self.start_ts, open_until=ts + 2 * self.heartbeat)
+            self.checkpoint_ts = ts
+
+    def close(self, ts):
+        if self.event is None:
+            return
+        dur = ts - self.start_ts
+        self.writer.checkpoint(self.event, dur)
+        logging.info(f"Closed: {self.title} (duration: {dur}s)")
+        self.event = None
+        self.key = None
+
+
+class ActivityState:
+    """
+    Consumidor do stream: transforma amostras dos coletores em intervalos
+    (janela focada / ocioso) e eventos pontuais (comandos do terminal).
+    """
+
+    def __init__(self, hub, writer, tracker):
+        self.hub = hub
+        self.writer = writer
+        self.tracker = tracker
+        self.idle = False
+        self.window = None
+
+    def handle(self, sample):
+        t0 = time.perf_counter()
+        # Amostras chegam em ordem, mas coletores diferentes podem ter ts
+        # ligeiramente atrasados: o intervalo aberto nunca volta no tempo
+        ts = max(sample.ts, self.tracker.start_ts or 0)
+        if sample.kind == "window":
+            self.window = sample.data
+            if not self.idle:
+                self.open_window(ts)
+        elif sample.kind == "idle":
+            self.idle = True
+            self.tracker.open(
+                ts, "__idle__", "idle",
+                title="Sistema Ocioso",
+                detail=f"idle_seconds:{sample.data}"
+            )
+            logging.info(f"User idle detected ({sample.data}s)")
+        elif sample.kind == "active":
+            self.idle = False
+            # Volta do ócio: reabre a janela atual e pede uma amostra nova
+            self.hub.wake("window")
+            if self.window:
+                self.open_window(ts)
+        elif sample.kind == "command":
+            host, cmd = sample.data
+            self.writer.insert(sample.ts, "terminal", title=host, detail=cmd)
+        self.tracker.tick(int(time.time()))
+        LOOP_TIME.observe(time.perf_counter() - t0)
+
+    def open_window(self, ts):
+        title, pid, window_id = self.window
+        if title == self.tracker.key:
+            return
+        with COLLECTOR_TIME.time(source="proc"):
+            detail = process_detail(window_id, pid)
+        self.tracker.open(ts, title, "window", title=title, detail=detail)
+        logging.info(f"New window: {title}")
+
+
+def report_metrics(path):
+    """Resumo das métricas no agent.log e snapshot lido pela API em /api/metrics"""
+    for line in metrics.summary_lines():
+        logging.info(f"Metrics: {line}")
+    try:
+        metrics.write_snapshot(path)
+    except OSError as e:
+        logging.warning(f"Could not write metrics snapshot: {e}")
+
+
+async def run_agent(writer):
+    hub = CollectorHub()
+    tracker = IntervalTracker(writer)
+    state = ActivityState(hub, writer, tracker)
+    metrics_path = DB_PATH.parent / metrics.AGENT_SNAPSHOT
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda sig=sig: stop(hub, sig))
+
+    async def report_loop():
+        while not hub.stopping:
+            await asyncio.sleep(METRICS_SEC)
+            report_metrics(metrics_path)
+
+    reporter = asyncio.create_task(report_loop())
+    try:
+        await hub.run(state.handle, idle=tracker.tick)
+    finally:
+        reporter.cancel()
+        tracker.close(int(time.time()))
+        report_metrics(metrics_path)
+
+
+def stop(hub, sig):
     logging.info(f"Received signal {sig}, stopping agent...")
-    stop_flag = True
+    hub.stop()
 
 
 def main_loop():
-    global last_event_id
     init_db()
+    clear_open_intervals()
+    writer = get_writer("agent")
     logging.info("Activity tracker agent started")
     
-    last_title = None
-    last_ts = int(time.time())
-    
-    while not stop_flag:
-        try:
-            ts = int(time.time())
-            idle = get_idle_seconds_x11()
-            
-            if idle >= IDLE_THRESHOLD:
-                # record idle event if not already idle
-                if last_title != "__idle__":
-                    if last_event_id and last_title and last_title != "__idle__":
-                        dur = ts - last_ts
-                        update_last_event_duration(last_event_id, dur)
-                    
-                    last_event_id = insert_event(
-                        ts, "idle", 
-                        title="Sistema Ocioso", 
-                        detail=f"idle_seconds:{int(idle)}"
-                    )
-                    last_title = "__idle__"
-                    last_ts = ts
-                    logging.info(f"User idle detected ({int(idle)}s)")
-                time.sleep(POLL_SEC)
-                continue
-
-            title = get_active_window_title()
-            pid = get_active_window_pid()
-            detail = f"pid:{pid}" if pid else "no_pid"
-            
-            if title != last_title:
-                # close previous event with duration
-                if last_event_id and last_title and last_title != "__idle__":
-                    dur = ts - last_ts
-                    update_last_event_duration(last_event_id, dur)
-                    logging.info(f"Closed: {last_title} (duration: {dur}s)")
-                
-                # new event start
-                last_event_id = insert_event(ts, "window", title=title, detail=detail, duration=0)
-                logging.info(f"New window: {title}")
-                last_title = title
-                last_ts = ts
-            else:
-                # Atualiza duração do evento atual periodicamente
-                if last_event_id:
-                    dur = ts - last_ts
-                    update_last_event_duration(last_event_id, dur)
-                    
-        except Exception as e:
-            logging.error(f"Error in main loop: {e}", exc_info=True)
-        
-        time.sleep(POLL_SEC)
-    
-    # Final cleanup
-    if last_event_id and last_title:
-        dur = int(time.time()) - last_ts
-        update_last_event_duration(last_event_id, dur)
+    asyncio.run(run_agent(writer))
     
+    # Garante que nada fica na fila ao receber SIGTERM/SIGINT
+    writer.stop()
     logging.info("Activity tracker agent stopped")
 
 if __name__ == "__main__":
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
     print("Starting activity-tracker agent...")
     print(f"Logs: {LOG_DIR / 'agent.log'}")
     main_loop()
@@ -8,12 +8,37 @@ import time
 import json
 import logging
 import os
+import queue
+import threading
+import uuid
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from db import fetch_events
+from categorizer import categorize, category_names
+from db import (
+    data_version, fetch_events, fetch_events_after_id, fetch_events_by_id,
+    fetch_open_events, fetch_rollup, iter_events, latest_event_id,
+)
 
 logging.basicConfig(level=logging.INFO)
 
+# Config
+SUMMARY_DIR = os.path.expanduser("~/.activity_tracker")
+CATEGORY_DAYS_CACHED = 7      # dias mantidos no cache de categorias
+CATEGORY_REBUILD_SEC = 3600   # recontagem completa (pega eventos apagados/alterados)
+SUMMARY_JOBS_KEPT = 20        # jobs de resumo guardados para consulta
+
+
+def _top_apps(counts: Counter) -> List[Dict]:
+    return [{"name": app, "count": count} for app, count in counts.most_common(5)]
+
+
+def _day_bounds(date: datetime):
+    """[início, fim) do dia local de `date` (o fim respeita horário de verão)"""
+    start = datetime(date.year, date.month, date.day)
+    end = start + timedelta(days=1)
+    return int(start.timestamp()), int(end.timestamp())
+
 class ActivitySummarizer:
     def __init__(self, use_ollama=True):
         """
@@ -31,11 +56,10 @@ class ActivitySummarizer:
         if date is None:
             date = datetime.now()
         
-        # Início e fim do dia
-        day_start = int(datetime(date.year, date.month, date.day, 0, 0, 0).timestamp())
-        day_end = day_start + 86400
+        # Início e fim do dia (23 ou 25 horas na troca do horário de verão)
+        day_start, day_end = _day_bounds(date)
         
-        rows = fetch_events(day_start, day_end, limit=10000)
+        rows = fetch_events(day_start, day_end - 1, limit=10000)
         
         activities = []
         for r in rows:
@@ -50,63 +74,30 @@ class ActivitySummarizer:
         
         return activities
     
+    def get_daily_totals(self, date: Optional[datetime] = None) -> List[tuple]:
+        """Totais (título, segundos) do dia, lidos das rollups por hora"""
+        if date is None:
+            date = datetime.now()
+        
+        day_start, day_end = _day_bounds(date)
+        totals = {}
+        for _typ, title, dur, _count in fetch_rollup(day_start, day_end - 1):
+            totals[title] = totals.get(title, 0) + dur
+        return sorted(totals.items(), key=lambda x: x[1], reverse=True)
+    
     def categorize_activities(self, activities: List[Dict]) -> Dict:
         """Categoriza atividades automaticamente"""
-        categories = {
-            "work": {"time": 0, "apps": []},
-            "communication": {"time": 0, "apps": []},
-            "entertainment": {"time": 0, "apps": []},
-            "productivity": {"time": 0, "apps": []},
-            "social_media": {"time": 0, "apps": []},
-            "development": {"time": 0, "apps": []},
-            "idle": {"time": 0, "apps": []},
-            "other": {"time": 0, "apps": []}
-        }
-        
-        # Palavras-chave para categorização
-        keywords = {
-            "work": ["office", "excel", "word", "powerpoint", "docs", "sheets", "slides", "email", "calendar"],
-            "communication": ["whatsapp", "telegram", "discord", "slack", "teams", "zoom", "meet", "skype", "messages"],
-            "entertainment": ["youtube", "netflix", "spotify", "twitch", "video", "music", "game"],
-            "productivity": ["notion", "evernote", "trello", "asana", "jira", "todoist", "notes"],
-            "social_media": ["facebook", "twitter", "instagram", "linkedin", "reddit", "tiktok"],
-            "development": ["vscode", "code", "terminal", "github", "gitlab", "stackoverflow", "python", "javascript", "git"]
-        }
+        names = category_names()
+        time_by_cat = {name: 0 for name in names}
+        apps = {name: Counter() for name in names}
         
         for activity in activities:
-            title_lower = activity["title"].lower()
-            detail_lower = activity["detail"].lower()
-            duration = activity["duration"]
-            typ = activity["type"]
-            
-            # Idle tem prioridade
-            if typ == "idle" or "ocioso" in title_lower:
-                categories["idle"]["time"] += duration
-                categories["idle"]["apps"].append(activity["title"])
-                continue
-            
-            # Tenta categorizar por palavras-chave
-            categorized = False
-            for category, words in keywords.items():
-                if any(word in title_lower or word in detail_lower for word in words):
-                    categories[category]["time"] += duration
-                    categories[category]["apps"].append(activity["title"])
-                    categorized = True
-                    break
-            
-            if not categorized:
-                categories["other"]["time"] += duration
-                categories["other"]["apps"].append(activity["title"])
-        
-        # Remove duplicatas e conta ocorrências
-        for cat in categories.values():
-            app_counts = {}
-            for app in cat["apps"]:
-                app_counts[app] = app_counts.get(app, 0) + 1
-            cat["apps"] = [{"name": app, "count": count} for app, count in 
-                          sorted(app_counts.items(), key=lambda x: x[1], reverse=True)[:5]]
+            category = categorize(activity["type"], activity["title"], activity["detail"])
+            time_by_cat[category] += activity["duration"]
+            apps[category][activity["title"]] += 1
         
-        return categories
+        # Top 5 títulos por ocorrências
+        return {name: {"time": time_by_cat[name], "apps": _top_apps(apps[name])} for name in names}
     
     def generate_summary_ollama(self, activities: List[Dict], categories: Dict) -> str:
         """Gera resumo usando Ollama"""
@@ -272,14 +263,15 @@ Seja objetivo, amigável e construtivo. Responda em português brasileiro.
         
         return summary
     
-    def generate_daily_summary(self, date: Optional[datetime] = None) -> str:
-        """Gera o resumo completo do dia"""
+    def generate_daily_summary(self, date: Optional[datetime] = None, categories: Optional[Dict] = None) -> str:
+        """Gera o resumo completo do dia (`categories` já calculadas, ex.: do CategoryCache)"""
         activities = self.get_daily_activities(date)
         
         if not activities:
             return "# Nenhuma atividade registrada hoje\n\nO monitoramento pode não estar ativo ou nenhuma atividade foi detectada."
         
-        categories = self.categorize_activities(activities)
+        if categories is None:
+            categories = self.categorize_activities(activities)
         
         if self.use_ollama:
             ai_summary = self.generate_summary_ollama(activities, categories)
@@ -292,8 +284,7 @@ Seja objetivo, amigável e construtivo. Responda em português brasileiro.
         if not ai_summary or "erro" in ai_summary.lower():
             return self.generate_summary_fallback(
                 categories, 
-                sorted([(a["title"], a["duration"]) for a in activities], 
-                       key=lambda x: x[1], reverse=True)[:10],
+                self.get_daily_totals(date)[:10],
                 sum(cat["time"] for cat in categories.values()) // 3600,
                 (sum(cat["time"] for cat in categories.values()) % 3600) // 60
             )
@@ -301,6 +292,177 @@ Seja objetivo, amigável e construtivo. Responda em português brasileiro.
         return ai_summary
 
 
+class _DayCategories:
+    """Totais por categoria de um dia, atualizados a partir dos ids novos"""
+
+    def __init__(self, date: datetime):
+        self.start, self.end = _day_bounds(date)
+        self.names = category_names()
+        self.time = {name: 0 for name in self.names}
+        self.apps = {name: Counter() for name in self.names}
+        self.pending = {}   # id -> (categoria, duração já somada) dos intervalos abertos
+        self.version = None
+        self.built_at = time.monotonic()
+        # Contagem inicial só até o último id de agora; o resto vem por refresh()
+        self.last_id = latest_event_id()
+        open_ids = {r[0] for r in fetch_open_events()}
+        for row in iter_events(self.start, self.end - 1):
+            if row[0] <= self.last_id:
+                self._add(row, open_ids)
+
+    def _add(self, row, open_ids):
+        event_id, _ts, typ, title, detail, duration = row
+        category = categorize(typ, title or "", detail or "")
+        self.time[category] += duration or 0
+        self.apps[category][title or ""] += 1
+        if event_id in open_ids:
+            self.pending[event_id] = (category, duration or 0)
+
+    def refresh(self, version):
+        # Sem commits e sem intervalo aberto, nada mudou
+        if version == self.version and not self.pending:
+            return
+        new_rows = []
+        while True:
+            rows = fetch_events_after_id(self.last_id)
+            new_rows.extend(r for r in rows if self.start <= r[1] < self.end)
+            if not rows:
+                break
+            self.last_id = rows[-1][0]
+        open_ids = {r[0] for r in fetch_open_events()}
+
+        # Intervalo aberto já contado: soma só o quanto cresceu
+        current = {r[0]: r[5] or 0 for r in fetch_events_by_id(self.pending)}
+        for event_id, (category, counted) in list(self.pending.items()):
+            duration = current.get(event_id, counted)
+            self.time[category] += duration - counted
+            if event_id in open_ids:
+                self.pending[event_id] = (category, duration)
+            else:
+                del self.pending[event_id]
+
+        for row in new_rows:
+            self._add(row, open_ids)
+        self.version = version
+
+    def result(self) -> Dict:
+        return {name: {"time": self.time[name], "apps": _top_apps(self.apps[name])} for name in self.names}
+
+
+class CategoryCache:
+    """
+    Tempo por categoria de cada dia, no formato de categorize_activities().
+    O dia é contado uma vez; depois cada consulta lê só os eventos novos
+    (id maior que o último visto) e a duração dos intervalos abertos. Sem
+    commits desde a consulta anterior (db.data_version), nada é lido.
+    """
+
+    def __init__(self, days=CATEGORY_DAYS_CACHED):
+        self.days = days
+        self._days = OrderedDict()   # "AAAA-MM-DD" -> _DayCategories
+        self._lock = threading.Lock()
+
+    def get(self, date: Optional[datetime] = None) -> Dict:
+        date = date or datetime.now()
+        key = date.strftime("%Y-%m-%d")
+        with self._lock:
+            day = self._days.get(key)
+            # Recontagem periódica cobre eventos apagados ou editados
+            if day is None or time.monotonic() - day.built_at > CATEGORY_REBUILD_SEC:
+                day = self._days[key] = _DayCategories(date)
+            self._days.move_to_end(key)
+            while len(self._days) > self.days:
+                self._days.popitem(last=False)
+            day.refresh(data_version()[0])
+            return day.result()
+
+
+class SummaryJobs:
+    """
+    Gera resumos com IA em segundo plano, um por vez, numa thread própria:
+    a chamada ao LLM (até 60s) não prende uma thread de requisição. Um
+    pedido igual a um job ainda na fila ou rodando reaproveita esse job.
+    """
+
+    def __init__(self, categories: Optional[CategoryCache] = None, kept=SUMMARY_JOBS_KEPT):
+        self.categories = categories
+        self.kept = kept
+        self._jobs = OrderedDict()   # id -> dict de status
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, date: Optional[datetime] = None, use_ollama=True) -> Dict:
+        date = date or datetime.now()
+        day = date.strftime("%Y-%m-%d")
+        with self._lock:
+            for job in self._jobs.values():
+                if job["date"] == day and job["ollama"] == use_ollama and job["status"] in ("pending", "running"):
+                    return dict(job)
+            job = {
+                "id": uuid.uuid4().hex[:12], "date": day, "ollama": use_ollama,
+                "status": "pending", "created": time.time(), "started": None,
+                "finished": None, "summary": None, "error": None,
+            }
+            self._jobs[job["id"]] = job
+            self._trim()
+            if self._worker is None:
+                # daemon: um resumo em andamento não segura o encerramento da API
+                self._worker = threading.Thread(target=self._run, name="summary-jobs", daemon=True)
+                self._worker.start()
+        self._queue.put((job["id"], date))
+        return dict(job)
+
+    def get(self, job_id) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def latest(self, date: Optional[datetime] = None) -> Optional[Dict]:
+        """Job mais recente do dia, se houver"""
+        day = (date or datetime.now()).strftime("%Y-%m-%d")
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job["date"] == day:
+                    return dict(job)
+        return None
+
+    def _trim(self):
+        # Descarta os jobs concluídos mais antigos
+        done = [j for j, job in self._jobs.items() if job["status"] in ("done", "error")]
+        for job_id in done[:max(0, len(self._jobs) - self.kept)]:
+            del self._jobs[job_id]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self):
+        while True:
+            job_id, date = self._queue.get()
+            with self._lock:
+                use_ollama = self._jobs[job_id]["ollama"]
+            self._update(job_id, status="running", started=time.time())
+            try:
+                categories = self.categories.get(date) if self.categories else None
+                summary = ActivitySummarizer(use_ollama=use_ollama).generate_daily_summary(date, categories)
+                save_summary(summary, date)
+                self._update(job_id, status="done", summary=summary, finished=time.time())
+            except Exception as e:
+                logging.error(f"Summary job {job_id} failed: {e}", exc_info=True)
+                self._update(job_id, status="error", error=str(e), finished=time.time())
+
+
+def save_summary(summary: str, date: Optional[datetime] = None) -> str:
+    """Salva o resumo em ~/.activity_tracker/summary_AAAA-MM-DD.md"""
+    os.makedirs(SUMMARY_DIR, exist_ok=True)
+    day = (date or datetime.now()).strftime("%Y-%m-%d")
+    output_file = os.path.join(SUMMARY_DIR, f"summary_{day}.md")
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(summary)
+    return output_file
+
+
 def main():
     """Gera resumo do dia atual"""
     print("🤖 Gerando resumo do dia...\n")
@@ -312,14 +474,7 @@ def main():
     print(summary)
     
     # Salva em arquivo
-    output_dir = os.path.expanduser("~/.activity_tracker")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    today = datetime.now().strftime("%Y-%m-%d")
-    output_file = os.path.join(output_dir, f"summary_{today}.md")
-    
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(summary)
+    output_file = save_summary(summary)
     
     print(f"\n💾 Resumo salvo em: {output_file}")
 
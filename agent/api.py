@@ -1,11 +1,28 @@
 #!/usr/bin/env python3
 # agent/api.py
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, g, jsonify, send_from_directory, request
 from flask_cors import CORS
-from db import fetch_events, insert_event, init_db
+from werkzeug.http import is_resource_modified
+import encoders
+import metrics
+from cache import ResultCache
+from db import (
+    DB_PATH, ChangeMonitor, fetch_events, fetch_events_after_id, fetch_open_events,
+    fetch_rollup, init_db, insert_events, iter_events, latest_event_id, search_events,
+)
+from writer import get_writer
+from ai_summarizer import CategoryCache, SummaryJobs
+from export import gzip_chunks, iter_markdown, local_midnight, parse_range
+from timeseries import DEFAULT_TOP, timeseries, validate as validate_timeseries
+import html
+import json
 import time
+from datetime import datetime
 from pathlib import Path
 import logging
+import signal
+import sys
+import threading
 
 # Setup logging
 logging.basicConfig(
@@ -13,99 +30,525 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Máximo de eventos aceitos em um POST /api/log_events
+MAX_BATCH_EVENTS = 1000
+
+# Paginação de /api/events
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+# Paginação de /api/search
+DEFAULT_SEARCH_PAGE = 50
+MAX_SEARCH_PAGE = 200
+
+# /api/stream (server-sent events)
+STREAM_POLL_SEC = 1          # intervalo entre checagens de PRAGMA data_version
+STREAM_KEEPALIVE_SEC = 15    # comentário enviado para manter a conexão viva
+STREAM_STATS_SEC = 15        # reenvia estatísticas (intervalo aberto cresce sem commits)
+STREAM_BATCH = 500           # eventos por mensagem ao alcançar o último id
+STREAM_RETRY_MS = 3000       # espera do EventSource antes de reconectar
+STREAM_MAX_CLIENTS = 4       # conexões abertas ao mesmo tempo (cada uma ocupa uma thread)
+STREAM_MAX_SEC = 300         # duração de uma conexão; o cliente reconecta e libera a vaga
+STREAM_BUSY_RETRY_MS = 30000 # espera pedida ao EventSource com todas as vagas ocupadas
+
+# Corpo máximo de uma requisição (um lote de MAX_BATCH_EVENTS cabe com folga)
+MAX_CONTENT_LENGTH = 4 * 1024 * 1024
+
 app = Flask(__name__, static_folder="static", template_folder="static")
+app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
 CORS(app)  # Permite requisições da extensão do navegador
 init_db()
 
+REQUEST_TIME = metrics.histogram("http_request_seconds", "Latência das requisições da API por endpoint")
+
+# Respostas de leitura, invalidadas quando os dados mudam (ver cache.py)
+_cache = ResultCache()
+
+# Categorias mantidas incrementalmente e resumos com IA em segundo plano
+_categories = CategoryCache()
+_summaries = SummaryJobs(_categories)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.teardown_request
+def _observe_request(exc):
+    # Respostas em streaming são medidas até o início do envio
+    start = g.pop("request_start", None)
+    if start is not None:
+        REQUEST_TIME.observe(
+            time.perf_counter() - start,
+            endpoint=request.endpoint or "unmatched", method=request.method
+        )
+
+def _cached(endpoint, params, end_ts, build, mimetype="application/json", headers=None):
+    """
+    Resposta de leitura passando pelo cache: 304 se o cliente já tem a
+    versão atual, o corpo guardado se houver, senão build() (bytes ou
+    iterável de pedaços, guardado ao terminar). `params` identifica a
+    consulta já normalizada; end_ts=None é "até agora".
+    """
+    state = _cache.state(endpoint, params, end_ts)
+    if not is_resource_modified(request.environ, etag=state.etag, last_modified=state.last_modified):
+        _cache.not_modified(state)
+        resp = Response(status=304)
+    else:
+        body = _cache.get(state)
+        if body is None:
+            body = build()
+            if isinstance(body, bytes):
+                _cache.put(state, body)
+            else:
+                body = _cache.tee(state, body)
+        resp = Response(body, mimetype=mimetype, headers=headers)
+    resp.set_etag(state.etag)
+    resp.last_modified = state.last_modified
+    # O navegador guarda, mas sempre revalida com If-None-Match
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
 @app.route("/")
 def index():
     return send_from_directory("static", "index.html")
 
+@app.route("/summary.html")
+def summary_page():
+    return send_from_directory("static", "summary.html")
+
+def _event_dict(r):
+    return {
+        "id": r[0],
+        "ts": r[1],
+        "type": r[2],
+        "title": r[3],
+        "detail": r[4],
+        "duration": r[5]
+    }
+
+def _encode_cursor(row):
+    return f"{row[1]}:{row[0]}"
+
+def _decode_cursor(cursor):
+    """Cursor opaco "ts:id" -> (ts, id)"""
+    ts, _, event_id = cursor.partition(":")
+    return int(ts), int(event_id)
+
+def _types_arg():
+    """Lê ?type=window ou ?types=window,website"""
+    types = request.args.getlist("type")
+    for value in request.args.getlist("types"):
+        types.extend(t for t in value.split(",") if t)
+    return types or None
+
 @app.route("/api/events")
 def events():
+    """
+    Eventos paginados por cursor (ts, id). A resposta traz `next_cursor`
+    enquanto houver mais linhas. Com stream=1 o intervalo inteiro é enviado
+    como um array JSON gerado incrementalmente. format=columnar, msgpack ou
+    arrow trocam a lista de objetos por formatos compactos (ver encoders.py).
+    """
     start = request.args.get("start", type=int)
     end = request.args.get("end", type=int)
-    rows = fetch_events(start, end, limit=5000)
-    out = []
-    for r in rows:
-        out.append({
-            "id": r[0],
-            "ts": r[1],
-            "type": r[2],
-            "title": r[3],
-            "detail": r[4],
-            "duration": r[5]
-        })
-    return jsonify(out)
+    limit = max(1, min(request.args.get("limit", DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    types = _types_arg()
+    fmt = request.args.get("format", "json")
+    if fmt not in encoders.MIMETYPES:
+        return jsonify({"error": f"unknown format {fmt!r}, use one of {', '.join(encoders.MIMETYPES)}"}), 400
+    if not encoders.available(fmt):
+        return jsonify({"error": f"format {fmt!r} requires the {fmt if fmt != 'arrow' else 'pyarrow'} package"}), 501
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = _decode_cursor(request.args["cursor"])
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    stream = request.args.get("stream") in ("1", "true")
+    if stream and fmt != "json":
+        return jsonify({"error": "stream=1 only supports format=json"}), 400
+    params = (start, end, None if stream else limit, after, tuple(sorted(types or ())), stream, fmt)
+
+    if stream:
+        def generate():
+            yield b"["
+            first = True
+            for r in iter_events(start, end, after=after, types=types):
+                yield (b"" if first else b",") + encoders.dumps(_event_dict(r))
+                first = False
+            yield b"]"
+        return _cached("events", params, end, generate)
+
+    def page():
+        # Uma linha a mais só para saber se existe próxima página
+        rows = fetch_events(start, end, limit=limit + 1, after=after, types=types)
+        next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return encoders.encode(fmt, rows[:limit], next_cursor)
+    return _cached("events", params, end, page, mimetype=encoders.MIMETYPES[fmt])
 
 @app.route("/api/export_markdown")
 def export_md():
-    # Gera um markdown simples do dia atual
-    now = int(time.time())
-    day_start = now - (now % 86400)
-    rows = fetch_events(day_start, now, limit=10000)
-    lines = ["# Logbook diário\n"]
-    for r in rows:
-        ts = r[1]
-        tstr = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
-        typ = r[2]
-        title = r[3] or ""
-        detail = r[4] or ""
-        dur = r[5] or 0
-        lines.append(f"- **{tstr}** [{typ}] {title} — {detail} — {dur}s")
-    md = "\n".join(lines)
-    return md, 200, {"Content-Type": "text/markdown; charset=utf-8"}
+    """
+    Markdown de ?start=&end= (horário local; padrão: hoje até agora), gerado
+    em streaming. coalesce=1 junta eventos repetidos em sessões e gzip=1
+    compacta a resposta.
+    """
+    try:
+        start, end = parse_range(request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    coalesce = request.args.get("coalesce") in ("1", "true")
+    gzip = request.args.get("gzip") in ("1", "true")
+    # Sem ?end= o fim é "agora": a chave não pode depender do segundo atual
+    end_key = end if request.args.get("end") else None
+    headers = {"Content-Encoding": "gzip"} if gzip else None
+
+    def build():
+        chunks = iter_markdown(start, end, coalesce=coalesce)
+        return gzip_chunks(chunks) if gzip else chunks
+    return _cached(
+        "export_markdown", (start, end_key, coalesce, gzip), end_key, build,
+        mimetype="text/markdown", headers=headers
+    )
 
 @app.route("/api/log_event", methods=["POST"])
 def log_event():
     """Endpoint para extensão do navegador e outros clientes enviarem eventos"""
     try:
-        data = request.get_json()
-        ts = data.get("ts", int(time.time()))
-        typ = data.get("type", "unknown")
-        title = data.get("title", "")
-        detail = data.get("detail", "")
-        duration = data.get("duration", 0)
+        # Validado aqui: o writer grava em lote, e um evento inválido só
+        # falharia depois da resposta, junto com os de outros clientes
+        ts, typ, title, detail, duration = _parse_event(request.get_json(silent=True))
         
-        event_id = insert_event(ts, typ, title, detail, duration)
-        logging.info(f"Event logged: {typ} - {title}")
+        # Enfileira para o writer; o commit acontece no próximo flush
+        get_writer("api").insert(ts, typ, title, detail, duration)
+        logging.info(f"Event queued: {typ} - {title}")
         
-        return jsonify({"success": True, "event_id": event_id}), 200
+        return jsonify({"success": True, "queued": True}), 200
     except Exception as e:
         logging.error(f"Error logging event: {e}")
         return jsonify({"success": False, "error": str(e)}), 400
 
-@app.route("/api/stats")
-def stats():
-    """Estatísticas do dia"""
-    now = int(time.time())
-    day_start = now - (now % 86400)
-    rows = fetch_events(day_start, now, limit=10000)
+def _parse_event(data):
+    """Valida um evento recebido e devolve a tupla pronta para inserir"""
+    if not isinstance(data, dict):
+        raise ValueError("event must be a JSON object")
+    typ = data.get("type", "unknown")
+    if not isinstance(typ, str) or not typ:
+        raise ValueError("type must be a non-empty string")
+    title = data.get("title", "")
+    detail = data.get("detail", "")
+    for name, value in (("title", title), ("detail", detail)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+    try:
+        ts = int(data.get("ts", time.time()))
+        duration = int(data.get("duration", 0) or 0)
+    except (TypeError, ValueError):
+        raise ValueError("ts and duration must be integers")
+    if duration < 0:
+        raise ValueError("duration must be >= 0")
+    return ts, typ, title, detail, duration
+
+@app.route("/api/log_events", methods=["POST"])
+def log_events():
+    """
+    Recebe um lote de eventos como array JSON ou NDJSON (um objeto por
+    linha) e grava tudo em uma única transação.
+    """
+    body = request.get_data(as_text=True)
+    if request.mimetype == "application/json":
+        try:
+            items = json.loads(body)
+        except ValueError as e:
+            return jsonify({"success": False, "error": f"invalid JSON: {e}"}), 400
+        if not isinstance(items, list):
+            return jsonify({"success": False, "error": "expected a JSON array"}), 400
+    else:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValueError(f"invalid JSON line: {e}"))
+
+    if len(items) > MAX_BATCH_EVENTS:
+        return jsonify({"success": False, "error": f"batch larger than {MAX_BATCH_EVENTS} events"}), 413
+
+    results = [None] * len(items)
+    valid, positions = [], []
+    for i, item in enumerate(items):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            valid.append(_parse_event(item))
+            positions.append(i)
+        except ValueError as e:
+            results[i] = {"index": i, "error": str(e)}
+
+    try:
+        ids = insert_events(valid)
+    except Exception as e:
+        logging.error(f"Error logging batch: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    for i, event_id in zip(positions, ids):
+        results[i] = {"index": i, "event_id": event_id}
+    logging.info(f"Batch logged: {len(ids)} events, {len(items) - len(ids)} rejected")
+
+    return jsonify({"success": True, "inserted": len(ids), "results": results}), 200
+
+def _day_stats(now):
+    """Estatísticas do dia (desde a meia-noite local), a partir das rollups por hora"""
+    day_start = local_midnight(now)
     
     total_time = 0
     by_type = {}
     by_title = {}
     
-    for r in rows:
-        typ = r[2]
-        title = r[3] or "unknown"
-        dur = r[5] or 0
-        
+    for typ, _title, dur, _count in fetch_rollup(day_start, now):
         total_time += dur
         by_type[typ] = by_type.get(typ, 0) + dur
-        
-        if typ in ["window", "website"]:
-            by_title[title] = by_title.get(title, 0) + dur
+    
+    # Filtro de tipo aplicado no SQL
+    for _typ, title, dur, _count in fetch_rollup(day_start, now, types=("window", "website")):
+        title = title or "unknown"
+        by_title[title] = by_title.get(title, 0) + dur
     
     # Top 10 atividades
     top_activities = sorted(by_title.items(), key=lambda x: x[1], reverse=True)[:10]
     
-    return jsonify({
+    return {
         "total_seconds": total_time,
         "by_type": by_type,
         "top_activities": [{"title": t, "seconds": s} for t, s in top_activities]
-    })
+    }
+
+@app.route("/api/stats")
+def stats():
+    """Estatísticas do dia, a partir das rollups por hora"""
+    now = int(time.time())
+    return _cached("stats", (local_midnight(now),), None, lambda: jsonify(_day_stats(now)).get_data())
+
+# Vagas de /api/stream: sem limite, abas abertas ocupariam todas as threads
+# do servidor e o POST /api/log_event ficaria na fila
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS)
+
+def set_stream_limit(max_clients):
+    """Ajusta as vagas de /api/stream ao número de threads do servidor (serve.py)"""
+    global _stream_slots
+    _stream_slots = threading.BoundedSemaphore(max(1, max_clients))
+
+def _sse(event, data, event_id=None):
+    msg = f"event: {event}\n"
+    if event_id is not None:
+        msg += f"id: {event_id}\n"
+    return msg + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route("/api/stream")
+def stream():
+    """
+    Server-sent events com o que muda no banco, para o dashboard não
+    precisar recarregar o dia inteiro:
+      - events: eventos novos (id > último enviado); o id da mensagem é o
+        último evento, então o EventSource retoma dali via Last-Event-ID
+      - update: intervalos abertos com a duração até agora
+      - stats: estatísticas do dia, só quando mudam
+    Sem Last-Event-ID nem ?last_id=, começa a partir do último evento
+    gravado. Cada conexão checa PRAGMA data_version a cada STREAM_POLL_SEC:
+    sem commits, nenhuma tabela é lida.
+
+    Cada conexão ocupa uma thread do servidor, então só STREAM_MAX_CLIENTS
+    ficam abertas ao mesmo tempo, e cada uma por no máximo STREAM_MAX_SEC.
+    Sem vaga, a resposta é só um evento busy com retry: STREAM_BUSY_RETRY_MS:
+    o EventSource reconecta sozinho depois (um 503 o faria desistir).
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        last_id = int(last_id) if last_id else latest_event_id()
+    except ValueError:
+        return jsonify({"error": "invalid last event id"}), 400
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    slots = _stream_slots
+    if not slots.acquire(blocking=False):
+        logging.warning("Event stream limit reached, asking client to retry later")
+        body = f"retry: {STREAM_BUSY_RETRY_MS}\n\n" + _sse("busy", {"retry_ms": STREAM_BUSY_RETRY_MS})
+        return Response(body, mimetype="text/event-stream", headers=headers)
+
+    def generate():
+        nonlocal last_id
+        monitor = ChangeMonitor()
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            changed = True
+            sent_stats = None
+            stats_at = keepalive_at = 0
+            deadline = time.monotonic() + STREAM_MAX_SEC
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    # Reconecta via Last-Event-ID e devolve a vaga a quem espera
+                    break
+                if changed:
+                    # Alcança o último id em lotes
+                    while True:
+                        rows = fetch_events_after_id(last_id, STREAM_BATCH)
+                        if not rows:
+                            break
+                        last_id = rows[-1][0]
+                        yield _sse("events", [_event_dict(r) for r in rows], last_id)
+                    open_rows = fetch_open_events()
+                    if open_rows:
+                        yield _sse("update", [_event_dict(r) for r in open_rows])
+                if changed or now - stats_at >= STREAM_STATS_SEC:
+                    day_stats = _day_stats(int(time.time()))
+                    if day_stats != sent_stats:
+                        yield _sse("stats", day_stats)
+                        sent_stats = day_stats
+                        keepalive_at = now
+                    stats_at = now
+                if now - keepalive_at >= STREAM_KEEPALIVE_SEC:
+                    # Escrita periódica: detecta cliente desconectado e libera a thread
+                    yield ": keepalive\n\n"
+                    keepalive_at = now
+                time.sleep(STREAM_POLL_SEC)
+                changed = monitor.changed()
+        finally:
+            monitor.close()
+
+    response = Response(generate(), mimetype="text/event-stream", headers=headers)
+    # close() é chamado pelo servidor mesmo se o gerador nunca começar
+    response.call_on_close(slots.release)
+    return response
+
+@app.route("/api/timeseries")
+def timeseries_endpoint():
+    """
+    Tempo por bucket para gráficos: ?start=&end= (horário local, como no
+    export; padrão: hoje), bucket=minute|hour|day|week, group_by=type|title|category,
+    top=N grupos por bucket e types= para filtrar. Agregado no SQL.
+    """
+    try:
+        start, end = parse_range(request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    bucket = request.args.get("bucket", "hour")
+    group_by = request.args.get("group_by", "type")
+    top = max(1, request.args.get("top", DEFAULT_TOP, type=int))
+    types = _types_arg()
+    end_key = end if request.args.get("end") else None
+    params = (start, end_key, bucket, group_by, top, tuple(sorted(types or ())))
+
+    try:
+        # Valida antes do cache, para não responder 304 a um pedido inválido
+        validate_timeseries(start, end, bucket, group_by)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def build():
+        return encoders.dumps(timeseries(start, end, bucket, group_by, top, types))
+    return _cached("timeseries", params, end_key, build)
+
+def _mark_snippet(snippet):
+    # O texto vem cru do banco: escapa e só então troca os marcadores por <mark>
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+@app.route("/api/search")
+def search():
+    """
+    Busca textual em títulos e detalhes (URLs, comandos): ?q= obrigatório,
+    start/end em unix time, types= e limit. Resultados do mais relevante
+    para o menos, com trechos em HTML (termos em <mark>); `next_cursor`
+    enquanto houver mais.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "missing q"}), 400
+    start = request.args.get("start", type=int)
+    end = request.args.get("end", type=int)
+    limit = max(1, min(request.args.get("limit", DEFAULT_SEARCH_PAGE, type=int), MAX_SEARCH_PAGE))
+    types = _types_arg()
+    # Cursor opaco: a posição na ordem por relevância
+    offset = request.args.get("cursor", 0, type=int)
+    if offset < 0:
+        return jsonify({"error": "invalid cursor"}), 400
+    params = (query, start, end, limit, offset, tuple(sorted(types or ())))
+
+    def build():
+        # Uma linha a mais só para saber se existe próxima página
+        rows = search_events(query, start, end, limit=limit + 1, offset=offset, types=types)
+        hits = [
+            dict(_event_dict(r), rank=r[6], snippets={"title": _mark_snippet(r[7]), "detail": _mark_snippet(r[8])})
+            for r in rows[:limit]
+        ]
+        next_cursor = str(offset + limit) if len(rows) > limit else None
+        return encoders.dumps({"query": query, "hits": hits, "next_cursor": next_cursor})
+
+    try:
+        return _cached("search", params, end, build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def _date_arg():
+    """?date=AAAA-MM-DD (padrão: hoje)"""
+    value = request.args.get("date")
+    return datetime.strptime(value, "%Y-%m-%d") if value else datetime.now()
+
+@app.route("/api/categories")
+def categories():
+    """Tempo e principais títulos por categoria do dia, do cache incremental"""
+    try:
+        date = _date_arg()
+    except ValueError:
+        return jsonify({"error": "date must be AAAA-MM-DD"}), 400
+    return jsonify(_categories.get(date))
+
+@app.route("/api/summary", methods=["GET", "POST"])
+def summary():
+    """
+    POST inicia a geração do resumo do dia com IA (ollama=true|false) em
+    segundo plano e responde 202 com o job; acompanhe em
+    /api/summary/<id>. GET devolve o job mais recente do dia.
+    """
+    try:
+        date = _date_arg()
+    except ValueError:
+        return jsonify({"error": "date must be AAAA-MM-DD"}), 400
+    if request.method == "POST":
+        use_ollama = request.args.get("ollama", "true") in ("1", "true")
+        job = _summaries.submit(date, use_ollama)
+        return jsonify(job), 202, {"Location": f"/api/summary/{job['id']}"}
+    job = _summaries.latest(date)
+    if job is None:
+        return jsonify({"error": "no summary job for this date"}), 404
+    return jsonify(job)
+
+@app.route("/api/summary/<job_id>")
+def summary_job(job_id):
+    """Status de um job de resumo: pending, running, done (com o markdown) ou error"""
+    job = _summaries.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job)
+
+@app.route("/api/metrics")
+def metrics_endpoint():
+    """Métricas da API e do último snapshot do agente, formato Prometheus"""
+    agent_snapshot = metrics.read_snapshot(DB_PATH.parent / metrics.AGENT_SNAPSHOT)
+    body = metrics.render([
+        (metrics.snapshot(), {"process": "api"}),
+        (agent_snapshot, {"process": "agent"}),
+    ])
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    logging.info("Starting Activity Tracker API on port 5001")
-    app.run(host="0.0.0.0", port=5001, debug=False)
+    # SIGTERM vira SystemExit para que o atexit do writer grave a fila
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
+    # Servidor de desenvolvimento; em produção use serve.py
+    logging.info("Starting Activity Tracker API on 127.0.0.1:5001 (development server)")
+    app.run(host="127.0.0.1", port=5001, threaded=True, debug=False)
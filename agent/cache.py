@@ -0,0 +1,119 @@
+# agent/cache.py
+"""
+Cache de respostas da API.
+
+Uma resposta depende só dos parâmetros e dos dados no banco: enquanto
+ninguém grava, a mesma requisição devolve os mesmos bytes. Cada entrada
+guarda a versão dos dados (db.data_version) em que foi calculada e deixa
+de valer quando ela muda.
+
+Faixas "ao vivo" (sem fim, com fim no futuro ou cobrindo um intervalo
+aberto) mudam sem escritas, porque a duração do intervalo aberto cresce
+com o relógio. Para elas a validade também expira a cada LIVE_TTL
+segundos.
+
+O ETag é derivado só da versão e da janela de tempo, então um
+If-None-Match é respondido com 304 antes de qualquer consulta.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import metrics
+from db import data_version, open_interval_start
+
+# Config
+CACHE_SIZE = 128                       # respostas guardadas (LRU)
+CACHE_MAX_ENTRY_BYTES = 2 * 1024 * 1024  # respostas maiores passam direto
+LIVE_TTL = 10                          # segundos de validade de faixas ao vivo
+
+# ETags de uma execução anterior da API nunca coincidem com os atuais
+BOOT_ID = f"{int(time.time()):x}"
+
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Requisições cacheáveis por endpoint e resultado (hit, miss, not_modified)"
+)
+
+
+class CacheState:
+    """Chave, versão e validadores HTTP de uma requisição"""
+
+    def __init__(self, endpoint, key, version, changed_ts, live, now):
+        self.endpoint = endpoint
+        self.key = key
+        # Faixa ao vivo: a "versão" também avança a cada LIVE_TTL segundos
+        window = int(now // LIVE_TTL) if live else 0
+        self.version = (version, window)
+        self.etag = f"{BOOT_ID}-{version}-{window}"
+        modified = max(changed_ts, window * LIVE_TTL)
+        self.last_modified = datetime.fromtimestamp(int(modified), timezone.utc)
+
+
+class ResultCache:
+    """LRU de respostas prontas (bytes), invalidado pela versão dos dados"""
+
+    def __init__(self, size=CACHE_SIZE, max_entry_bytes=CACHE_MAX_ENTRY_BYTES):
+        self.size = size
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()   # key -> (versão, corpo)
+        self._lock = threading.Lock()
+
+    def state(self, endpoint, params, end_ts=None):
+        """
+        Estado para `endpoint` com `params` já normalizados (hashable).
+        end_ts=None significa "até agora".
+        """
+        now = time.time()
+        version, changed_ts = data_version()
+        live = end_ts is None or end_ts >= now
+        if not live:
+            oldest_open = open_interval_start()
+            live = oldest_open is not None and end_ts >= oldest_open
+        return CacheState(endpoint, (endpoint, params), version, changed_ts, live, now)
+
+    def get(self, state):
+        with self._lock:
+            entry = self._entries.get(state.key)
+            if entry is not None and entry[0] == state.version:
+                self._entries.move_to_end(state.key)
+                CACHE_REQUESTS.inc(endpoint=state.endpoint, result="hit")
+                return entry[1]
+            if entry is not None:
+                del self._entries[state.key]
+        CACHE_REQUESTS.inc(endpoint=state.endpoint, result="miss")
+        return None
+
+    def put(self, state, body):
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._entries[state.key] = (state.version, body)
+            self._entries.move_to_end(state.key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def tee(self, state, chunks):
+        """
+        Repassa um stream e guarda o corpo completo no fim, se couber.
+        Um cliente que desconecta no meio não deixa entrada parcial.
+        """
+        parts, size = [], 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            if parts is not None:
+                size += len(data)
+                if size > self.max_entry_bytes:
+                    parts = None
+                else:
+                    parts.append(data)
+            yield data
+        if parts is not None:
+            self.put(state, b"".join(parts))
+
+    def not_modified(self, state):
+        CACHE_REQUESTS.inc(endpoint=state.endpoint, result="not_modified")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,130 @@
+# agent/categorizer.py
+"""
+Categorização de atividades por palavras-chave.
+
+As regras (categoria -> palavras) são testadas em ordem, como sempre, e o
+resultado de cada texto (título ou detalhe) fica num LRU: os mesmos poucos
+títulos se repetem milhares de vezes por dia, e o detalhe (pid, URL) só é
+analisado de novo quando muda. A palavra pode aparecer em qualquer parte do
+título ou do detalhe, sem diferenciar maiúsculas, e vence a primeira
+categoria na ordem das regras.
+
+Regras do usuário ficam em ~/.activity_tracker/categories.json e têm
+prioridade sobre as padrão; uma categoria nova é criada pelo nome:
+
+    {"development": ["pycharm", "kubectl"], "study": ["coursera", "udemy"]}
+"""
+import json
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+# Config
+RULES_PATH = Path.home() / ".activity_tracker" / "categories.json"
+MEMO_SIZE = 8192        # textos (títulos e detalhes) com o resultado memorizado
+
+# Regras padrão, em ordem de prioridade
+DEFAULT_RULES = {
+    "work": ["office", "excel", "word", "powerpoint", "docs", "sheets", "slides", "email", "calendar"],
+    "communication": ["whatsapp", "telegram", "discord", "slack", "teams", "zoom", "meet", "skype", "messages"],
+    "entertainment": ["youtube", "netflix", "spotify", "twitch", "video", "music", "game"],
+    "productivity": ["notion", "evernote", "trello", "asana", "jira", "todoist", "notes"],
+    "social_media": ["facebook", "twitter", "instagram", "linkedin", "reddit", "tiktok"],
+    "development": ["vscode", "code", "terminal", "github", "gitlab", "stackoverflow", "python", "javascript", "git"],
+}
+
+IDLE = "idle"
+OTHER = "other"
+
+
+def load_rules(path=RULES_PATH):
+    """
+    Regras do usuário na frente das padrão: {categoria: [palavras]}. Um
+    arquivo ausente usa só as padrão; um inválido é ignorado com aviso.
+    """
+    rules = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            user = json.load(f)
+        if not isinstance(user, dict) or not all(
+            isinstance(words, list) and all(isinstance(w, str) for w in words) for words in user.values()
+        ):
+            raise ValueError("expected {category: [keywords]}")
+        rules.update((str(name), words) for name, words in user.items())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring category rules in {path}: {e}")
+    for name, words in DEFAULT_RULES.items():
+        # Mesma categoria nas duas: as palavras do usuário vêm antes
+        rules[name] = rules.get(name, []) + words
+    return rules
+
+
+class Categorizer:
+    """Regras em ordem de prioridade, com memo LRU por texto (título ou detalhe)"""
+
+    def __init__(self, rules=None, memo_size=MEMO_SIZE):
+        rules = DEFAULT_RULES if rules is None else rules
+        self.rules = {name: [w.lower() for w in words if w] for name, words in rules.items()}
+        # Todas as categorias possíveis, na ordem de prioridade
+        self.names = tuple(n for n in self.rules if n not in (IDLE, OTHER)) + (IDLE, OTHER)
+        self._scan = lru_cache(maxsize=memo_size)(self._scan_text)
+
+    def _scan_text(self, text):
+        # (tem "ocioso", (prioridade, categoria) da primeira regra que casa ou None)
+        text = text.lower()
+        for priority, (name, words) in enumerate(self.rules.items()):
+            if any(word in text for word in words):
+                return "ocioso" in text, (priority, name)
+        return "ocioso" in text, None
+
+    def categorize(self, typ, title, detail=""):
+        """Categoria de uma atividade; título e detalhe são analisados uma vez cada"""
+        # Idle tem prioridade
+        if typ == "idle":
+            return IDLE
+        title_idle, best = self._scan(title or "")
+        if title_idle:
+            return IDLE
+        if detail:
+            found = self._scan(detail)[1]
+            if found is not None and (best is None or found < best):
+                best = found
+        return best[1] if best else OTHER
+
+    def cache_info(self):
+        return self._scan.cache_info()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_categorizer():
+    """Motor compartilhado (agente, resumos e API), montado na primeira chamada"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = Categorizer(load_rules())
+    return _default
+
+
+def reload_rules():
+    """Relê RULES_PATH; o memo começa vazio"""
+    global _default
+    with _default_lock:
+        _default = Categorizer(load_rules())
+    return _default
+
+
+def categorize(typ, title, detail=""):
+    """Categoria de uma atividade com as regras atuais"""
+    return get_categorizer().categorize(typ, title, detail)
+
+
+def category_names():
+    """Categorias possíveis, na ordem de prioridade (idle e other por último)"""
+    return get_categorizer().names
@@ -0,0 +1,223 @@
+# agent/collectors.py
+"""
+Framework de coletores do agente (asyncio).
+
+Cada fonte (ócio, janela focada, comandos do shell, ...) é uma corrotina
+independente, com seu próprio ritmo, registrada com @register. Todas
+publicam amostras numa fila única; o agente consome essa fila em ordem de
+chegada e decide o que gravar. Um probe travado atrasa só o próprio coletor.
+
+Novo coletor:
+
+    @register("bateria")
+    async def battery_collector(ctx):
+        while await ctx.sleep(60):
+            out = await ctx.run(["acpi", "-b"])
+            if out is not None:
+                await ctx.emit("battery", out.strip())
+"""
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+from metrics import histogram
+
+# Config
+COMMAND_TIMEOUT = 1.0      # segundos até matar um probe externo travado
+RESTART_BACKOFF = (1, 5, 30, 60)  # espera antes de reiniciar um coletor que falhou
+
+COLLECTOR_TIME = histogram("collector_seconds", "Latência de cada consulta de janela/ócio por fonte")
+
+# Amostra publicada por um coletor
+Sample = namedtuple("Sample", "ts source kind data")
+
+_registry = {}
+
+
+def register(name):
+    """Decorador: registra `async def coletor(ctx)` com esse nome"""
+    def decorator(fn):
+        _registry[name] = fn
+        return fn
+    return decorator
+
+
+def registered():
+    """Nomes dos coletores registrados, em ordem de registro"""
+    return list(_registry)
+
+
+class CollectorContext:
+    """O que um coletor enxerga do hub: publicar, dormir e rodar comandos"""
+
+    def __init__(self, hub, name):
+        self.hub = hub
+        self.name = name
+        self._wake = asyncio.Event()
+
+    @property
+    def stopping(self):
+        return self.hub.stopping
+
+    async def emit(self, kind, data=None, ts=None):
+        await self.hub.queue.put(Sample(int(ts if ts is not None else time.time()), self.name, kind, data))
+
+    def emit_nowait(self, kind, data=None, ts=None):
+        """emit() para callbacks síncronos rodando no próprio loop"""
+        self.hub.queue.put_nowait(Sample(int(ts if ts is not None else time.time()), self.name, kind, data))
+
+    def emit_threadsafe(self, kind, data=None, ts=None):
+        """emit() para threads fora do loop (ex.: callbacks do X11)"""
+        self.hub.emit_threadsafe(self.name, kind, data, ts)
+
+    async def sleep(self, seconds):
+        """
+        Dorme até `seconds`, até hub.wake(nome) ou até o hub parar.
+        Devolve False quando o coletor deve encerrar.
+        """
+        if self.stopping:
+            return False
+        waiters = [asyncio.ensure_future(self._wake.wait()), asyncio.ensure_future(self.hub.stopped.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
+        self._wake.clear()
+        return not self.stopping
+
+    async def run(self, args, timeout=COMMAND_TIMEOUT, check=True):
+        """
+        Roda um comando sem bloquear o loop e devolve o stdout, ou None se
+        ele não existir, passar do timeout ou (com check) sair com erro.
+        """
+        t0 = time.perf_counter()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+        except OSError as e:
+            logging.debug(f"{args[0]} failed: {e}")
+            return None
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            logging.debug(f"{args[0]} timed out after {timeout}s")
+            return None
+        finally:
+            COLLECTOR_TIME.observe(time.perf_counter() - t0, source=args[0])
+        if check and proc.returncode != 0:
+            return None
+        return out.decode("utf-8", "replace")
+
+    async def call(self, fn, *args, source, timeout=COMMAND_TIMEOUT):
+        """Roda uma função bloqueante numa thread, com timeout e medição"""
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout)
+        finally:
+            COLLECTOR_TIME.observe(time.perf_counter() - t0, source=source)
+
+
+class CollectorHub:
+    """Roda os coletores registrados e entrega as amostras a um consumidor"""
+
+    def __init__(self, names=None):
+        self.names = names or registered()
+        self.loop = None
+        self.queue = None
+        self.stopped = None
+        self._contexts = {}
+        self._shared = {}
+
+    @property
+    def stopping(self):
+        return self.stopped is not None and self.stopped.is_set()
+
+    def shared(self, key, factory):
+        """Recurso único compartilhado entre coletores (ex.: conexão X11)"""
+        if key not in self._shared:
+            self._shared[key] = factory()
+        return self._shared[key]
+
+    def emit_threadsafe(self, source, kind, data=None, ts=None):
+        """Publica uma amostra em nome de `source` a partir de outra thread"""
+        sample = Sample(int(ts if ts is not None else time.time()), source, kind, data)
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, sample)
+
+    def wake(self, name):
+        """Interrompe o sleep do coletor `name` para ele amostrar já"""
+        ctx = self._contexts.get(name)
+        if ctx is not None:
+            ctx._wake.set()
+
+    def stop(self):
+        """Pode ser chamado de qualquer thread ou de um signal handler"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+
+    async def run(self, handle, idle=None, idle_every=60):
+        """
+        Consome o stream chamando handle(sample) até stop(). Sem amostras
+        por `idle_every` segundos, chama idle(ts) (checkpoints periódicos).
+        """
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.stopped = asyncio.Event()
+        tasks = []
+        for name in self.names:
+            ctx = self._contexts[name] = CollectorContext(self, name)
+            tasks.append(asyncio.create_task(self._supervise(name, _registry[name], ctx), name=name))
+        logging.info(f"Collectors started: {', '.join(self.names)}")
+
+        def guarded(fn, arg):
+            # Como no laço antigo: uma amostra com erro é registrada e o laço segue
+            try:
+                fn(arg)
+            except Exception as e:
+                logging.error(f"Error in main loop: {e}", exc_info=True)
+
+        stop_wait = asyncio.ensure_future(self.stopped.wait())
+        try:
+            while True:
+                get = asyncio.ensure_future(self.queue.get())
+                done, _ = await asyncio.wait(
+                    [get, stop_wait], timeout=idle_every, return_when=asyncio.FIRST_COMPLETED
+                )
+                if get in done:
+                    guarded(handle, get.result())
+                    continue
+                get.cancel()
+                if stop_wait in done:
+                    break
+                if idle:
+                    guarded(idle, int(time.time()))
+        finally:
+            self.stopped.set()
+            stop_wait.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # O que já estava na fila ainda entra, na ordem
+            while not self.queue.empty():
+                guarded(handle, self.queue.get_nowait())
+            for resource in self._shared.values():
+                if hasattr(resource, "stop"):
+                    resource.stop()
+
+    async def _supervise(self, name, fn, ctx):
+        # Um coletor que quebra é reiniciado com espera crescente
+        failures = 0
+        while not self.stopping:
+            try:
+                await fn(ctx)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = RESTART_BACKOFF[min(failures, len(RESTART_BACKOFF) - 1)]
+                failures += 1
+                logging.error(f"Collector {name} failed: {e}; restarting in {delay}s", exc_info=True)
+                if not await ctx.sleep(delay):
+                    return
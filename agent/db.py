@@ -1,72 +1,1125 @@
 # agent/db.py
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
 import sqlite3
+import tempfile
 import threading
-from contextlib import contextmanager
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 
-DB_PATH = Path.home() / ".activity_tracker" / "activity.db"
+from metrics import histogram
+
+DB_PATH = Path(os.environ.get(
+    "ACTIVITY_TRACKER_DB", Path.home() / ".activity_tracker" / "activity.db"
+)).expanduser()
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# Pool de conexões
+BUSY_TIMEOUT = 30      # segundos esperando o lock de escrita do SQLite
+READ_POOL_SIZE = 8     # conexões de leitura mantidas abertas
+STRING_CACHE_SIZE = 10000  # títulos/detalhes mantidos no cache texto -> id
+
+# Partições mensais: o banco quente guarda o mês corrente, meses fechados
+# viram arquivos somente leitura anexados só quando a consulta precisa deles
+ARCHIVE_DIR = DB_PATH.parent / "archive"
+ATTACH_BATCH = 8       # arquivos anexados por consulta (o SQLite aceita até 10)
+
+# Busca textual
+SEARCH_PAGE_STRINGS = 500   # textos casados por consulta de eventos, em ordem de relevância
+SEARCH_SNIPPET_TOKENS = 12  # palavras em volta do termo no trecho devolvido
+
 _schema = """
-CREATE TABLE IF NOT EXISTS events (
+-- Dicionário de textos: títulos e detalhes se repetem muito, então cada
+-- valor distinto é gravado uma única vez e referenciado por id
+CREATE TABLE IF NOT EXISTS strings (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS event_rows (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     ts INTEGER NOT NULL,
     type TEXT NOT NULL,          -- "window", "website", "terminal", "idle"
-    title TEXT,
-    detail TEXT,
+    title_id INTEGER REFERENCES strings(id),
+    detail_id INTEGER REFERENCES strings(id),
     duration INTEGER DEFAULT 0
 );
 
-CREATE INDEX IF NOT EXISTS idx_ts ON events(ts);
+CREATE INDEX IF NOT EXISTS idx_ts ON event_rows(ts);
+-- Cobre consultas filtradas por tipo: agregações leem só o índice
+CREATE INDEX IF NOT EXISTS idx_type_ts ON event_rows(type, ts, duration, title_id);
+-- Eventos de um título/detalhe, para a busca textual (search_events)
+CREATE INDEX IF NOT EXISTS idx_title_ts ON event_rows(title_id, ts);
+CREATE INDEX IF NOT EXISTS idx_detail_ts ON event_rows(detail_id, ts);
+
+-- Mesmo formato da antiga tabela events; leituras e SQL externo continuam iguais
+CREATE VIEW IF NOT EXISTS events AS
+SELECT e.id, e.ts, e.type, t.value AS title, d.value AS detail, e.duration
+FROM event_rows e
+LEFT JOIN strings t ON t.id = e.title_id
+LEFT JOIN strings d ON d.id = e.detail_id;
+
+CREATE TRIGGER IF NOT EXISTS trg_events_insert INSTEAD OF INSERT ON events
+BEGIN
+    INSERT OR IGNORE INTO strings (value) SELECT NEW.title WHERE NEW.title IS NOT NULL;
+    INSERT OR IGNORE INTO strings (value) SELECT NEW.detail WHERE NEW.detail IS NOT NULL;
+    INSERT INTO event_rows (id, ts, type, title_id, detail_id, duration)
+    VALUES (NEW.id, NEW.ts, NEW.type,
+            (SELECT id FROM strings WHERE value = NEW.title),
+            (SELECT id FROM strings WHERE value = NEW.detail),
+            COALESCE(NEW.duration, 0));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_events_update INSTEAD OF UPDATE ON events
+BEGIN
+    INSERT OR IGNORE INTO strings (value) SELECT NEW.title WHERE NEW.title IS NOT NULL;
+    INSERT OR IGNORE INTO strings (value) SELECT NEW.detail WHERE NEW.detail IS NOT NULL;
+    UPDATE event_rows
+    SET ts = NEW.ts, type = NEW.type,
+        title_id = (SELECT id FROM strings WHERE value = NEW.title),
+        detail_id = (SELECT id FROM strings WHERE value = NEW.detail),
+        duration = NEW.duration
+    WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_events_delete INSTEAD OF DELETE ON events
+BEGIN
+    DELETE FROM event_rows WHERE id = OLD.id;
+END;
+
+-- Intervalo ainda aberto (ex.: janela focada agora). Em events fica só a
+-- duração do último checkpoint; o "até agora" é derivado do ts de início.
+CREATE TABLE IF NOT EXISTS open_intervals (
+    event_id INTEGER PRIMARY KEY,
+    expires_ts INTEGER NOT NULL      -- sem novo checkpoint até aqui, o agente morreu
+);
+
+-- Totais por hora, mantidos pelos triggers abaixo a cada insert/update/delete
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    bucket INTEGER NOT NULL,         -- início da hora (ts - ts % 3600)
+    type TEXT NOT NULL,
+    title_id INTEGER NOT NULL,       -- 0 quando o evento não tem título
+    duration INTEGER NOT NULL DEFAULT 0,
+    events INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, title_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON event_rows
+BEGIN
+    INSERT INTO rollup_hourly (bucket, type, title_id, duration, events)
+    VALUES (NEW.ts - NEW.ts % 3600, NEW.type, COALESCE(NEW.title_id, 0), COALESCE(NEW.duration, 0), 1)
+    ON CONFLICT (bucket, type, title_id) DO UPDATE
+        SET duration = duration + excluded.duration, events = events + 1;
+END;
+
+-- Caso comum (checkpoint de duração): só soma a diferença
+CREATE TRIGGER IF NOT EXISTS trg_rollup_duration AFTER UPDATE OF duration ON event_rows
+WHEN NEW.ts = OLD.ts AND NEW.type = OLD.type AND NEW.title_id IS OLD.title_id
+BEGIN
+    UPDATE rollup_hourly
+    SET duration = duration + COALESCE(NEW.duration, 0) - COALESCE(OLD.duration, 0)
+    WHERE bucket = NEW.ts - NEW.ts % 3600 AND type = NEW.type AND title_id = COALESCE(NEW.title_id, 0);
+END;
+
+-- Mudou a chave: tira do bucket antigo e soma no novo
+CREATE TRIGGER IF NOT EXISTS trg_rollup_move AFTER UPDATE OF ts, type, title_id ON event_rows
+WHEN NEW.ts != OLD.ts OR NEW.type != OLD.type OR NEW.title_id IS NOT OLD.title_id
+BEGIN
+    UPDATE rollup_hourly
+    SET duration = duration - COALESCE(OLD.duration, 0), events = events - 1
+    WHERE bucket = OLD.ts - OLD.ts % 3600 AND type = OLD.type AND title_id = COALESCE(OLD.title_id, 0);
+    DELETE FROM rollup_hourly
+    WHERE bucket = OLD.ts - OLD.ts % 3600 AND type = OLD.type AND title_id = COALESCE(OLD.title_id, 0)
+      AND events <= 0;
+    INSERT INTO rollup_hourly (bucket, type, title_id, duration, events)
+    VALUES (NEW.ts - NEW.ts % 3600, NEW.type, COALESCE(NEW.title_id, 0), COALESCE(NEW.duration, 0), 1)
+    ON CONFLICT (bucket, type, title_id) DO UPDATE
+        SET duration = duration + excluded.duration, events = events + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON event_rows
+BEGIN
+    UPDATE rollup_hourly
+    SET duration = duration - COALESCE(OLD.duration, 0), events = events - 1
+    WHERE bucket = OLD.ts - OLD.ts % 3600 AND type = OLD.type AND title_id = COALESCE(OLD.title_id, 0);
+    DELETE FROM rollup_hourly
+    WHERE bucket = OLD.ts - OLD.ts % 3600 AND type = OLD.type AND title_id = COALESCE(OLD.title_id, 0)
+      AND events <= 0;
+END;
+
+CREATE VIEW IF NOT EXISTS events_live AS
+SELECT e.id, e.ts, e.type, e.title, e.detail,
+       CASE WHEN o.event_id IS NULL THEN e.duration
+            ELSE MAX(e.duration, MIN(CAST(strftime('%s', 'now') AS INTEGER), o.expires_ts) - e.ts)
+       END AS duration
+FROM events e LEFT JOIN open_intervals o ON o.event_id = e.id;
+"""
+
+# Busca textual só no banco quente: strings nunca é podada e os arquivos
+# mensais reaproveitam os mesmos ids, então um índice cobre todo o histórico.
+# Cada texto distinto é indexado uma vez (conteúdo externo: o texto fica só
+# em strings).
+_search_schema = """
+CREATE VIRTUAL TABLE IF NOT EXISTS strings_fts USING fts5(
+    value, content = 'strings', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_strings_fts_insert AFTER INSERT ON strings
+BEGIN
+    INSERT INTO strings_fts (rowid, value) VALUES (NEW.id, NEW.value);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_strings_fts_delete AFTER DELETE ON strings
+BEGIN
+    INSERT INTO strings_fts (strings_fts, rowid, value) VALUES ('delete', OLD.id, OLD.value);
+END;
+"""
+
+# Migração do formato antigo (events como tabela com TEXT em cada linha)
+_migrate_strings = """
+CREATE TABLE strings (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+CREATE TABLE event_rows (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    title_id INTEGER REFERENCES strings(id),
+    detail_id INTEGER REFERENCES strings(id),
+    duration INTEGER DEFAULT 0
+);
+INSERT OR IGNORE INTO strings (value)
+    SELECT title FROM events WHERE title IS NOT NULL
+    UNION SELECT detail FROM events WHERE detail IS NOT NULL;
+INSERT INTO event_rows (id, ts, type, title_id, detail_id, duration)
+    SELECT e.id, e.ts, e.type, t.id, d.id, e.duration
+    FROM events e
+    LEFT JOIN strings t ON t.value = e.title
+    LEFT JOIN strings d ON d.value = e.detail;
+-- Mantém a sequência do AUTOINCREMENT mesmo se os últimos ids foram apagados
+UPDATE sqlite_sequence
+    SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'events'), 0))
+    WHERE name = 'event_rows';
+DELETE FROM sqlite_sequence WHERE name = 'events';
+DROP VIEW IF EXISTS events_live;
+DROP TABLE IF EXISTS rollup_hourly;
+DROP TABLE events;
 """
 
+# Aplicados uma vez por conexão, logo após abrir
+_pragmas = (
+    "PRAGMA synchronous = NORMAL",     # seguro com WAL; fsync só no checkpoint
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",       # ~8 MB de cache de páginas
+    "PRAGMA mmap_size = 134217728",    # 128 MB mapeados para leitura
+)
+
+
+def _connect(readonly=False):
+    """Abre uma conexão já configurada. Transações são controladas à mão."""
+    # uri=True para poder anexar arquivos mensais com ?mode=ro
+    con = sqlite3.connect(
+        DB_PATH.as_uri(), uri=True, timeout=BUSY_TIMEOUT,
+        isolation_level=None, check_same_thread=False
+    )
+    for pragma in _pragmas:
+        con.execute(pragma)
+    if readonly:
+        con.execute("PRAGMA query_only = ON")
+    return con
+
+
+class _ReadPool:
+    """Pool de conexões somente leitura, reaproveitadas entre threads"""
+
+    def __init__(self, size):
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return _connect(readonly=True)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, con):
+        self._idle.put(con)
+        self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 _lock = threading.Lock()
+_writer = None
+_readers = _ReadPool(READ_POOL_SIZE)
+
+LOCK_WAIT = histogram("db_lock_wait_seconds", "Espera pelo lock de escrita (process: _lock, sqlite: BEGIN IMMEDIATE)")
+COMMIT_TIME = histogram("db_commit_seconds", "Duração do COMMIT das transações de escrita")
+
+# Cache texto -> id de strings; só acessado com _lock adquirido
+_string_ids = OrderedDict()
+_new_strings = []   # inseridos na transação corrente (descartados no rollback)
+
+
+def _writer_conn():
+    # Chamado sempre com _lock adquirido
+    global _writer
+    if _writer is None:
+        _writer = _connect()
+        # WAL é persistente no arquivo: leitores nunca bloqueiam o escritor
+        _writer.execute("PRAGMA journal_mode = WAL")
+    return _writer
+
 
 @contextmanager
 def conn():
+    """Conexão de escrita persistente; cada bloco `with` é uma transação."""
+    t0 = time.perf_counter()
     with _lock:
-        con = sqlite3.connect(str(DB_PATH), timeout=30)
+        t1 = time.perf_counter()
+        LOCK_WAIT.observe(t1 - t0, lock="process")
+        con = _writer_conn()
+        con.execute("BEGIN IMMEDIATE")
+        LOCK_WAIT.observe(time.perf_counter() - t1, lock="sqlite")
+        _new_strings.clear()
         try:
             yield con
-            con.commit()
-        finally:
-            con.close()
+            with COMMIT_TIME.time():
+                con.execute("COMMIT")
+            _bump_version()
+        except BaseException:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            # Ids criados nessa transação deixaram de existir
+            for value in _new_strings:
+                _string_ids.pop(value, None)
+            raise
+
+
+@contextmanager
+def read_conn():
+    """Empresta uma conexão somente leitura do pool"""
+    con = _readers.acquire()
+    try:
+        yield con
+    finally:
+        _readers.release(con)
+
+
+def close_pool():
+    """Fecha todas as conexões abertas (checkpoint do WAL no fechamento)"""
+    global _writer
+    with _lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+    _readers.close_all()
+
+
+atexit.register(close_pool)
+
+
+# Versão do esquema gravada em PRAGMA user_version
+SCHEMA_VERSION = 3
+
 
 def init_db():
+    with _lock:
+        con = _writer_conn()
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        legacy = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'events' AND type = 'table'"
+        ).fetchone()
+        if legacy:
+            # executescript faz seu próprio COMMIT; a migração é uma transação só
+            con.executescript("BEGIN IMMEDIATE;" + _migrate_strings + "COMMIT;")
+        con.executescript(_schema)
+        con.executescript(_search_schema)
+    if version < 2:
+        # Rollups ausentes ou no formato antigo: preenche a partir dos eventos
+        rebuild_rollups()
+    if version < 3:
+        # Índice de busca novo: indexa os textos já gravados
+        rebuild_search_index()
+    with _lock:
+        _writer_conn().execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def rebuild_rollups():
+    """Recalcula rollup_hourly inteira a partir de event_rows"""
+    with conn() as c:
+        c.execute("DELETE FROM rollup_hourly")
+        c.execute(
+            """INSERT INTO rollup_hourly (bucket, type, title_id, duration, events)
+               SELECT ts - ts % 3600, type, COALESCE(title_id, 0), SUM(COALESCE(duration, 0)), COUNT(*)
+               FROM event_rows GROUP BY 1, 2, 3"""
+        )
+        return c.execute("SELECT COUNT(*) FROM rollup_hourly").fetchone()[0]
+
+def rebuild_search_index():
+    """Reconstrói strings_fts a partir de strings; devolve quantos textos indexou"""
     with conn() as c:
-        c.executescript(_schema)
+        c.execute("INSERT INTO strings_fts (strings_fts) VALUES ('rebuild')")
+        c.execute("INSERT INTO strings_fts (strings_fts) VALUES ('optimize')")
+        return c.execute("SELECT COUNT(*) FROM strings").fetchone()[0]
+
+def vacuum():
+    """Reescreve o arquivo do banco, devolvendo ao disco o espaço livre"""
+    with _lock:
+        _writer_conn().execute("VACUUM")
+
+def _intern(c, value):
+    """Id de `value` em strings, criando se preciso. Chamado dentro de conn()."""
+    if value is None:
+        return None
+    sid = _string_ids.get(value)
+    if sid is not None:
+        _string_ids.move_to_end(value)
+        return sid
+    c.execute("INSERT OR IGNORE INTO strings (value) VALUES (?)", (value,))
+    sid = c.execute("SELECT id FROM strings WHERE value = ?", (value,)).fetchone()[0]
+    _string_ids[value] = sid
+    _new_strings.append(value)
+    if len(_string_ids) > STRING_CACHE_SIZE:
+        _string_ids.popitem(last=False)
+    return sid
+
+def insert_event_row(c, ts, typ, title=None, detail=None, duration=0):
+    """Insere direto em event_rows dentro de uma transação conn() aberta"""
+    cur = c.execute(
+        "INSERT INTO event_rows (ts, type, title_id, detail_id, duration) VALUES (?, ?, ?, ?, ?)",
+        (int(ts), typ, _intern(c, title), _intern(c, detail), int(duration))
+    )
+    return cur.lastrowid
 
 def insert_event(ts, typ, title=None, detail=None, duration=0):
     with conn() as c:
-        c.execute(
-            "INSERT INTO events (ts, type, title, detail, duration) VALUES (?, ?, ?, ?, ?)",
-            (int(ts), typ, title, detail, int(duration))
+        return insert_event_row(c, ts, typ, title, detail, duration)
+
+def insert_events(rows):
+    """
+    Insere vários eventos (ts, type, title, detail, duration) em uma única
+    transação e devolve os ids na mesma ordem.
+    """
+    if not rows:
+        return []
+    with conn() as c:
+        encoded = [
+            (int(ts), typ, _intern(c, title), _intern(c, detail), int(duration))
+            for ts, typ, title, detail, duration in rows
+        ]
+        c.executemany(
+            "INSERT INTO event_rows (ts, type, title_id, detail_id, duration) VALUES (?, ?, ?, ?, ?)",
+            encoded
         )
-        return c.lastrowid
+        # Com AUTOINCREMENT e o lock de escrita seguro, os ids do lote são contíguos
+        last = c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'event_rows'").fetchone()[0]
+    return list(range(last - len(encoded) + 1, last + 1))
 
 def update_last_event_duration(event_id, duration):
     """Atualiza a duração de um evento existente"""
     with conn() as c:
         c.execute(
-            "UPDATE events SET duration = ? WHERE id = ?",
+            "UPDATE event_rows SET duration = ? WHERE id = ?",
             (int(duration), event_id)
         )
 
-def fetch_events(start_ts=None, end_ts=None, limit=1000):
-    q = "SELECT id, ts, type, title, detail, duration FROM events"
-    params = []
-    if start_ts is not None or end_ts is not None:
-        q += " WHERE"
-        conds = []
-        if start_ts is not None:
-            conds.append(" ts >= ? ")
-            params.append(int(start_ts))
-        if end_ts is not None:
-            conds.append(" ts <= ? ")
-            params.append(int(end_ts))
-        q += " AND ".join(conds)
-    q += " ORDER BY ts ASC LIMIT ?"
-    params.append(limit)
+def clear_open_intervals():
+    """Descarta intervalos abertos deixados por uma execução anterior do agente"""
     with conn() as c:
-        cur = c.execute(q, params)
-        return cur.fetchall()
+        c.execute("DELETE FROM open_intervals")
+
+def _types_filter(types, column="type"):
+    # Devolve (sql, params) para "type IN (...)"; types vazio/None não filtra
+    types = list(types or ())
+    if not types:
+        return None, []
+    return f"{column} IN ({', '.join('?' * len(types))})", types
+
+def _events_sql(schema, where):
+    return f"SELECT id, ts, type, title, detail, duration FROM {schema}.events_live{where}"
+
+def fetch_events(start_ts=None, end_ts=None, limit=1000, after=None, types=None):
+    """
+    Eventos em ordem (ts, id). `after` é o cursor (ts, id) da última linha
+    já lida: a página seguinte começa logo depois dele (paginação keyset).
+    `types` restringe aos tipos dados, filtrando no SQL (idx_type_ts).
+    Meses arquivados que cruzam o intervalo são anexados sob demanda.
+    """
+    rows = []
+    with read_conn() as c:
+        for lo, hi, archives in _spans(start_ts, end_ts):
+            if after is not None and hi is not None and hi < after[0]:
+                continue
+            conds, params = [], []
+            if lo is not None:
+                conds.append("ts >= ?")
+                params.append(int(lo))
+            if hi is not None:
+                conds.append("ts <= ?")
+                params.append(int(hi))
+            type_cond, type_params = _types_filter(types)
+            if type_cond:
+                conds.append(type_cond)
+                params.extend(type_params)
+            if after is not None:
+                after_ts, after_id = after
+                # ts >= ? sozinho já usa o índice; o OR desempata pelo id
+                conds.append("ts >= ? AND (ts > ? OR id > ?)")
+                params.extend((int(after_ts), int(after_ts), int(after_id)))
+            where = (" WHERE " + " AND ".join(conds)) if conds else ""
+
+            with _attached(c, archives) as schemas:
+                # events_live completa a duração do intervalo aberto até o momento
+                q = " UNION ALL ".join(_events_sql(schema, where) for schema in schemas)
+                q += " ORDER BY ts ASC, id ASC LIMIT ?"
+                cur = c.execute(q, params * len(schemas) + [limit - len(rows)])
+                rows.extend(cur.fetchall())
+            if len(rows) >= limit:
+                break
+    return rows
+
+def iter_events(start_ts=None, end_ts=None, after=None, chunk_size=1000, types=None):
+    """
+    Percorre todo o intervalo em páginas de `chunk_size`, sem limite total.
+    A memória fica constante: só uma página é mantida por vez.
+    """
+    while True:
+        rows = fetch_events(start_ts, end_ts, limit=chunk_size, after=after, types=types)
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1][1], rows[-1][0])
+
+def _split_hours(lo, hi):
+    """
+    [lo, hi) -> [(hora inteira?, início, fim)]: o miolo alinhado à hora UTC
+    sai de rollup_hourly, as pontas de event_rows. None é sem limite.
+    """
+    core_lo = None if lo is None else -(-lo // 3600) * 3600
+    core_hi = None if hi is None else hi - hi % 3600
+    if core_lo is not None and core_hi is not None and core_lo >= core_hi:
+        return [(False, lo, hi)]
+    pieces = []
+    if lo is not None and lo < core_lo:
+        pieces.append((False, lo, core_lo))
+    pieces.append((True, core_lo, core_hi))
+    if hi is not None and core_hi < hi:
+        pieces.append((False, core_hi, hi))
+    return pieces
+
+def fetch_rollup(start_ts=None, end_ts=None, types=None):
+    """
+    Totais (type, title, duration, events) do intervalo, lidos de
+    rollup_hourly (granularidade de 1h) mais o "até agora" dos intervalos
+    abertos, que ainda não foi gravado. As pontas fora da hora UTC (o dia
+    começa às :30 em fusos de meia hora) e a hora corrente vêm de event_rows.
+    """
+    totals = {}
+    type_cond, type_params = _types_filter(types, "r.type")
+    with read_conn() as c:
+        for lo, hi, archives in _spans(start_ts, end_ts):
+            with _attached(c, archives) as schemas:
+                parts, params = [], []
+                for hourly, p_lo, p_hi in _split_hours(lo, None if hi is None else int(hi) + 1):
+                    col = "bucket" if hourly else "ts"
+                    conds, piece_params = [], []
+                    if p_lo is not None:
+                        conds.append(f"r.{col} >= ?")
+                        piece_params.append(int(p_lo))
+                    if p_hi is not None:
+                        conds.append(f"r.{col} < ?")
+                        piece_params.append(int(p_hi))
+                    if type_cond:
+                        conds.append(type_cond)
+                        piece_params.extend(type_params)
+                    where = (" WHERE " + " AND ".join(conds)) if conds else ""
+                    table, cols = (
+                        ("rollup_hourly", "r.duration AS duration, r.events AS events") if hourly
+                        else ("event_rows", "COALESCE(r.duration, 0) AS duration, 1 AS events")
+                    )
+                    for schema in schemas:
+                        parts.append(
+                            f"""SELECT r.type, COALESCE(s.value, '') AS title, {cols}
+                                FROM {schema}.{table} r
+                                LEFT JOIN {schema}.strings s ON s.id = r.title_id{where}"""
+                        )
+                        params.extend(piece_params)
+                # Intervalos abertos só existem no banco quente
+                conds, open_params = [], []
+                if lo is not None:
+                    conds.append("r.ts >= ?")
+                    open_params.append(int(lo))
+                if hi is not None:
+                    conds.append("r.ts <= ?")
+                    open_params.append(int(hi))
+                if type_cond:
+                    conds.append(type_cond)
+                    open_params.extend(type_params)
+                parts.append(
+                    f"""SELECT r.type, COALESCE(s.value, ''),
+                               MAX(0, MIN(CAST(strftime('%s', 'now') AS INTEGER), o.expires_ts)
+                                      - r.ts - COALESCE(r.duration, 0)),
+                               0
+                        FROM open_intervals o
+                        JOIN event_rows r ON r.id = o.event_id
+                        LEFT JOIN strings s ON s.id = r.title_id
+                        {(" WHERE " + " AND ".join(conds)) if conds else ""}"""
+                )
+                params.extend(open_params)
+                q = f"""SELECT type, title, SUM(duration), SUM(events)
+                        FROM ({" UNION ALL ".join(parts)}) GROUP BY type, title"""
+                for typ, title, dur, count in c.execute(q, params):
+                    acc = totals.setdefault((typ, title), [0, 0])
+                    acc[0] += dur
+                    acc[1] += count
+    return [(typ, title, dur, count) for (typ, title), (dur, count) in totals.items()]
+
+def fetch_events_after_id(last_id, limit=1000):
+    """
+    Eventos do banco quente com id > last_id, em ordem de id (ordem de
+    gravação). Usado para acompanhar o que foi inserido desde a última leitura.
+    """
+    with read_conn() as c:
+        return c.execute(
+            "SELECT id, ts, type, title, detail, duration FROM events_live WHERE id > ? ORDER BY id LIMIT ?",
+            (int(last_id), limit)
+        ).fetchall()
+
+# Limites dos buckets de uma série temporal: [[início, fim], ...] em JSON.
+# MATERIALIZED (SQLite >= 3.35) extrai cada limite uma vez, não a cada linha comparada
+_BOUNDS_CTE = (
+    "WITH b(lo, hi) AS {}(SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))"
+).format("MATERIALIZED " if sqlite3.sqlite_version_info >= (3, 35, 0) else "")
+
+def fetch_timeseries(bounds, by_title=False, types=None, raw=False):
+    """
+    Totais (início do bucket, type, title, duration, events) agrupados no
+    SQL por bucket. `bounds` é a lista de [início, fim) de cada bucket,
+    calculada por quem chama (fuso local e horário de verão). As horas UTC
+    inteiras de cada bucket vêm de rollup_hourly; as pontas fora da hora
+    (fusos de meia hora, como Asia/Kolkata) vêm de event_rows. raw=True lê
+    tudo de event_rows, para buckets menores que uma hora. Sem by_title,
+    title vem None. A duração conta no bucket em que o evento começa.
+    """
+    if not bounds:
+        return []
+    start_ts, end_ts = bounds[0][0], bounds[-1][1] - 1
+    totals = {}
+    with read_conn() as c:
+        for lo, hi, archives in _spans(start_ts, end_ts):
+            # Limites recortados ao período do banco; a única faixa na consulta
+            # é b.lo/b.hi, para o índice ser usado bucket a bucket
+            span_bounds = []
+            pieces = {True: [], False: []}   # hora inteira? -> [[início, fim), ...]
+            starts = {}                      # início do pedaço -> início original do bucket
+            for b_lo, b_hi in bounds:
+                if b_hi <= lo or b_lo > hi:
+                    continue
+                c_lo, c_hi = max(b_lo, lo), min(b_hi, hi + 1)
+                span_bounds.append([c_lo, c_hi])
+                for hourly, p_lo, p_hi in [(False, c_lo, c_hi)] if raw else _split_hours(c_lo, c_hi):
+                    pieces[hourly].append([p_lo, p_hi])
+                    starts[p_lo] = b_lo
+            if not span_bounds:
+                continue
+            type_cond, params = _types_filter(types, "r.type")
+            where = f"WHERE {type_cond}" if type_cond else ""
+
+            with _attached(c, archives) as schemas:
+                parts = []
+                for hourly, piece_bounds in pieces.items():
+                    if not piece_bounds:
+                        continue
+                    table, ts_col, count = (
+                        ("rollup_hourly", "bucket", "SUM(r.events)") if hourly else ("event_rows", "ts", "COUNT(*)")
+                    )
+                    for schema in schemas:
+                        title_join = f" LEFT JOIN {schema}.strings s ON s.id = r.title_id" if by_title else ""
+                        # b como laço externo: cada bucket é uma busca por faixa na chave (bucket ou ts)
+                        parts.append((
+                            f"""{_BOUNDS_CTE}
+                                SELECT b.lo, r.type, {"s.value" if by_title else "NULL"}, SUM(r.duration), {count}
+                                FROM b CROSS JOIN {schema}.{table} r ON r.{ts_col} >= b.lo AND r.{ts_col} < b.hi
+                                {title_join} {where}
+                                GROUP BY b.lo, r.type{", r.title_id" if by_title else ""}""",
+                            [json.dumps(piece_bounds)] + params
+                        ))
+                # "Até agora" dos intervalos abertos, que só existem no banco quente
+                parts.append((
+                    f"""{_BOUNDS_CTE}
+                        SELECT b.lo, r.type, {"s.value" if by_title else "NULL"},
+                               SUM(MAX(0, MIN(CAST(strftime('%s', 'now') AS INTEGER), o.expires_ts)
+                                          - r.ts - COALESCE(r.duration, 0))), 0
+                        FROM open_intervals o CROSS JOIN event_rows r ON r.id = o.event_id
+                        CROSS JOIN b ON r.ts >= b.lo AND r.ts < b.hi
+                        LEFT JOIN strings s ON s.id = r.title_id
+                        {where}
+                        GROUP BY b.lo, r.type{", r.title_id" if by_title else ""}""",
+                    [json.dumps(span_bounds)] + params
+                ))
+                for sql, part_params in parts:
+                    for bucket, typ, title, dur, events in c.execute(sql, part_params):
+                        acc = totals.setdefault((starts[bucket], typ, title), [0, 0])
+                        acc[0] += dur or 0
+                        acc[1] += events or 0
+    return [(bucket, typ, title, dur, events) for (bucket, typ, title), (dur, events) in totals.items()]
+
+def _fts_query(text):
+    """
+    Texto digitado -> expressão MATCH do FTS5. Cada termo vira uma frase
+    entre aspas, então URLs, "PROJ-123" e comandos não quebram a sintaxe;
+    termo terminado em * busca por prefixo. Os termos são combinados com AND.
+    """
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+# Textos casados pela busca: [[id, rank], ...] em JSON
+_MATCHES_CTE = (
+    "WITH m(id, rank) AS {}(SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))"
+).format("MATERIALIZED " if sqlite3.sqlite_version_info >= (3, 35, 0) else "")
+
+def search_events(query, start_ts=None, end_ts=None, limit=50, offset=0, types=None):
+    """
+    Eventos cujo título ou detalhe casam com `query`, do mais relevante
+    (bm25 do texto) para o menos; empates do mais recente para o mais antigo.
+    Devolve [(id, ts, type, title, detail, duration, rank, trecho do título,
+    trecho do detalhe)]; os trechos marcam os termos entre \x02 e \x03 e são
+    None no campo que não casou. ValueError para uma busca vazia ou inválida.
+    """
+    match = _fts_query(query)
+    if not match:
+        raise ValueError("empty search query")
+    with read_conn() as c:
+        try:
+            # Só (id, rank) de cada texto casado; trechos saem no fim, para a página
+            found = c.execute(
+                "SELECT rowid, rank FROM strings_fts WHERE strings_fts MATCH ? ORDER BY rank", (match,)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"invalid search query: {e}") from None
+        if not found:
+            return []
+
+        wanted = offset + limit
+        hits = {}
+        for lo, hi, archives in _spans(start_ts, end_ts):
+            conds, params = [], []
+            if lo is not None:
+                conds.append("e.ts >= ?")
+                params.append(int(lo))
+            if hi is not None:
+                conds.append("e.ts <= ?")
+                params.append(int(hi))
+            type_cond, type_params = _types_filter(types, "e.type")
+            if type_cond:
+                conds.append(type_cond)
+                params.extend(type_params)
+            where = f" WHERE {' AND '.join(conds)}" if conds else ""
+            with _attached(c, archives) as schemas:
+                for schema in schemas:
+                    # Um lado por coluna, para cada um usar o seu índice
+                    sides = [
+                        f"""SELECT e.id, e.ts, e.type, e.title_id, e.detail_id, e.duration, m.rank
+                            FROM m CROSS JOIN {schema}.event_rows e ON e.{column} = m.id{where}"""
+                        for column in ("title_id", "detail_id")
+                    ]
+                    sql = f"""{_MATCHES_CTE}
+                              SELECT id, ts, type, title_id, detail_id, duration, MIN(rank) AS best
+                              FROM ({" UNION ALL ".join(sides)})
+                              GROUP BY id ORDER BY best, ts DESC LIMIT ?"""
+                    # Textos em ordem de relevância, SEARCH_PAGE_STRINGS por vez, com
+                    # os filtros já aplicados: cada banco devolve só as offset + limit
+                    # melhores, e a ordem final sai do merge
+                    best = {}
+                    for i in range(0, len(found), SEARCH_PAGE_STRINGS):
+                        chunk = found[i:i + SEARCH_PAGE_STRINGS]
+                        for row in c.execute(sql, [json.dumps(chunk)] + params + params + [wanted]):
+                            # Já visto por um texto mais relevante fica com aquele rank
+                            best.setdefault(row[0], row)
+                        if len(best) >= wanted:
+                            # Os próximos textos têm rank >= o último deste lote;
+                            # só um empate ainda pode entrar na página
+                            cutoff = sorted(r[6] for r in best.values())[wanted - 1]
+                            if chunk[-1][1] > cutoff:
+                                break
+                    hits.update(best)
+        page = sorted(hits.values(), key=lambda r: (r[6], -r[1], -r[0]))[offset:wanted]
+
+        # strings do banco quente tem todos os textos, inclusive os dos arquivos
+        ids = {sid for r in page for sid in (r[3], r[4]) if sid is not None}
+        texts = dict(c.execute(
+            f"SELECT id, value FROM strings WHERE id IN ({', '.join('?' * len(ids))})", list(ids)
+        )) if ids else {}
+        # Trecho só dos textos da página que casaram
+        snippets = dict(c.execute(
+            f"""SELECT rowid, snippet(strings_fts, 0, char(2), char(3), '…', ?)
+                FROM strings_fts WHERE strings_fts MATCH ? AND rowid IN ({', '.join('?' * len(ids))})""",
+            [SEARCH_SNIPPET_TOKENS, match] + list(ids)
+        )) if ids else {}
+    return [
+        (event_id, ts, typ, texts.get(title_id), texts.get(detail_id), duration, rank,
+         snippets.get(title_id), snippets.get(detail_id))
+        for event_id, ts, typ, title_id, detail_id, duration, rank in page
+    ]
+
+def fetch_events_by_id(ids):
+    """Eventos do banco quente com esses ids (os que ainda existem)"""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return []
+    with read_conn() as c:
+        return c.execute(
+            f"SELECT id, ts, type, title, detail, duration FROM events_live WHERE id IN ({', '.join('?' * len(ids))})",
+            ids
+        ).fetchall()
+
+def latest_event_id():
+    """Maior id de evento já gravado (0 com o banco vazio)"""
+    with read_conn() as c:
+        row = c.execute("SELECT MAX(id) FROM event_rows").fetchone()
+    return row[0] or 0
+
+def fetch_open_events():
+    """Eventos com intervalo aberto, com a duração até agora (events_live)"""
+    with read_conn() as c:
+        return c.execute(
+            """SELECT id, ts, type, title, detail, duration FROM events_live
+               WHERE id IN (SELECT event_id FROM open_intervals) ORDER BY id"""
+        ).fetchall()
+
+
+class ChangeMonitor:
+    """
+    Detecta commits de qualquer conexão ou processo sem ler tabelas:
+    PRAGMA data_version muda quando outra conexão grava no banco. O valor é
+    por conexão, então cada monitor tem a sua, fora do pool.
+    """
+
+    def __init__(self):
+        self._con = _connect(readonly=True)
+        self._version = self._read()
+
+    def _read(self):
+        return self._con.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self):
+        """True se houve commit desde a chamada anterior"""
+        version = self._read()
+        changed = version != self._version
+        self._version = version
+        return changed
+
+    def close(self):
+        self._con.close()
+
+
+# Versão dos dados para invalidar caches: só cresce
+_version_lock = threading.Lock()
+_version = 0
+_version_ts = time.time()
+_version_monitor = None
+
+
+def _bump_version():
+    global _version, _version_ts
+    with _version_lock:
+        _version += 1
+        _version_ts = time.time()
+
+
+def data_version():
+    """
+    (versão, instante da última mudança). Sobe a cada commit deste processo
+    e, via ChangeMonitor, a cada commit de outro processo (o agente).
+    """
+    global _version, _version_ts, _version_monitor
+    with _version_lock:
+        if _version_monitor is None:
+            _version_monitor = ChangeMonitor()
+        elif _version_monitor.changed():
+            _version += 1
+            _version_ts = time.time()
+        return _version, _version_ts
+
+def open_interval_start():
+    """ts do intervalo aberto mais antigo, ou None se não houver"""
+    with read_conn() as c:
+        return c.execute(
+            "SELECT MIN(e.ts) FROM open_intervals o JOIN event_rows e ON e.id = o.event_id"
+        ).fetchone()[0]
+
+
+# ======================
+# Partições mensais
+# ======================
+
+def _month_start(ts):
+    """Meia-noite local do dia 1 do mês de `ts`"""
+    t = time.localtime(ts)
+    return int(time.mktime((t.tm_year, t.tm_mon, 1, 0, 0, 0, 0, 0, -1)))
+
+def _next_month(month_start):
+    t = time.localtime(month_start)
+    year, month = (t.tm_year + 1, 1) if t.tm_mon == 12 else (t.tm_year, t.tm_mon + 1)
+    return int(time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1)))
+
+_archive_lock = threading.Lock()
+_archive_cache = {"mtime": None, "archives": []}
+
+def list_archives():
+    """[(início do mês, início do mês seguinte, caminho)] em ordem cronológica"""
+    try:
+        mtime = ARCHIVE_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _archive_lock:
+        if _archive_cache["mtime"] == mtime:
+            return _archive_cache["archives"]
+        found = {}
+        for path in ARCHIVE_DIR.iterdir():
+            name = path.name
+            if not name.startswith("activity-") or not name.endswith((".db", ".db.gz")):
+                continue
+            try:
+                year, month = name[len("activity-"):].split(".")[0].split("-")
+                start = int(time.mktime((int(year), int(month), 1, 0, 0, 0, 0, 0, -1)))
+            except ValueError:
+                continue
+            # .db descompactado tem preferência sobre o .db.gz
+            if start not in found or name.endswith(".db"):
+                found[start] = path
+        archives = [(start, _next_month(start), found[start]) for start in sorted(found)]
+        _archive_cache.update(mtime=mtime, archives=archives)
+        return archives
+
+@contextmanager
+def _archive_file(path):
+    """
+    Caminho anexável do arquivo. Um .db.gz é descompactado numa cópia
+    temporária em archive/.tmp/, apagada ao sair: só o mês consultado ocupa
+    espaço descompactado, e só durante a consulta.
+    """
+    if path.suffix != ".gz":
+        yield path
+        return
+    tmp_dir = ARCHIVE_DIR / ".tmp"
+    tmp_dir.mkdir(exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=tmp_dir, prefix=f"{path.stem}.", suffix=".tmp")
+    tmp = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as dst, gzip.open(path, "rb") as src:
+            shutil.copyfileobj(src, dst)
+        yield tmp
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def _spans(start_ts, end_ts):
+    """
+    Divide [start_ts, end_ts] em trechos com no máximo ATTACH_BATCH meses
+    arquivados cada: [(lo, hi, [arquivos])]. O banco quente entra em todos,
+    já que pode ter linhas atrasadas de meses já selados.
+    """
+    archives = [
+        a for a in list_archives()
+        if (end_ts is None or a[0] <= end_ts) and (start_ts is None or a[1] > start_ts)
+    ]
+    if not archives:
+        return [(start_ts, end_ts, [])]
+    spans = []
+    lo = start_ts
+    for i in range(0, len(archives), ATTACH_BATCH):
+        chunk = archives[i:i + ATTACH_BATCH]
+        last = i + ATTACH_BATCH >= len(archives)
+        hi = end_ts if last else chunk[-1][1] - 1
+        spans.append((lo, hi, [path for _, _, path in chunk]))
+        lo = chunk[-1][1]
+    return spans
+
+@contextmanager
+def _attached(c, archives):
+    """Anexa os arquivos em modo somente leitura; devolve os nomes dos schemas"""
+    names = []
+    # As cópias temporárias dos .db.gz só são apagadas depois do DETACH
+    with ExitStack() as files:
+        try:
+            for i, path in enumerate(archives):
+                name = f"p{i}"
+                archive = files.enter_context(_archive_file(path))
+                c.execute(f"ATTACH DATABASE ? AS {name}", (archive.as_uri() + "?mode=ro",))
+                names.append(name)
+            yield ["main"] + names
+        finally:
+            for name in names:
+                c.execute(f"DETACH DATABASE {name}")
+
+def rotate_partitions(compress=False, now=None):
+    """
+    Sela todos os meses anteriores ao corrente: copia as linhas para
+    archive/activity-AAAA-MM.db (compactado com VACUUM e, se pedido, gzip)
+    e as remove do banco quente. Devolve [(nome, eventos)].
+    """
+    cutoff = _month_start(now if now is not None else time.time())
+    # Cópias descompactadas permanentes de versões anteriores
+    shutil.rmtree(ARCHIVE_DIR / ".cache", ignore_errors=True)
+    with read_conn() as c:
+        oldest = c.execute("SELECT MIN(ts) FROM event_rows WHERE ts < ?", (cutoff,)).fetchone()[0]
+    sealed = []
+    month = _month_start(oldest) if oldest is not None else cutoff
+    while month < cutoff:
+        following = _next_month(month)
+        count = _seal_month(month, following, compress)
+        if count:
+            sealed.append((time.strftime("%Y-%m", time.localtime(month)), count))
+        month = following
+    return sealed
+
+def _seal_month(month, following, compress):
+    name = time.strftime("activity-%Y-%m", time.localtime(month))
+    final = ARCHIVE_DIR / f"{name}.db"
+    packed = ARCHIVE_DIR / f"{name}.db.gz"
+    # Intervalo ainda aberto continua no banco quente até fechar
+    selection = (
+        "FROM event_rows WHERE ts >= ? AND ts < ? "
+        "AND id NOT IN (SELECT event_id FROM open_intervals)"
+    )
+    hot_selection = (
+        "FROM hot.event_rows WHERE ts >= ? AND ts < ? "
+        "AND id NOT IN (SELECT event_id FROM hot.open_intervals)"
+    )
+    with read_conn() as c:
+        count = c.execute(f"SELECT COUNT(*) {selection}", (month, following)).fetchone()[0]
+    if not count:
+        return 0
+
+    ARCHIVE_DIR.mkdir(exist_ok=True)
+    created = False
+    if not final.exists() and not packed.exists():
+        tmp = ARCHIVE_DIR / f"{name}.db.tmp"
+        tmp.unlink(missing_ok=True)
+        arc = sqlite3.connect(tmp.as_uri(), uri=True, isolation_level=None)
+        try:
+            # Sem WAL: o arquivo é aberto depois só com ?mode=ro
+            arc.execute("PRAGMA journal_mode = DELETE")
+            arc.executescript(_schema)
+            arc.execute("ATTACH DATABASE ? AS hot", (DB_PATH.as_uri() + "?mode=ro",))
+            arc.execute("BEGIN")
+            # Mesmos ids de strings do banco quente; triggers montam as rollups
+            arc.execute(
+                f"""INSERT INTO strings (id, value)
+                    SELECT id, value FROM hot.strings WHERE id IN (
+                        SELECT title_id {hot_selection}
+                        UNION
+                        SELECT detail_id {hot_selection}
+                    )""",
+                (month, following, month, following)
+            )
+            arc.execute(
+                f"""INSERT INTO event_rows (id, ts, type, title_id, detail_id, duration)
+                    SELECT id, ts, type, title_id, detail_id, duration
+                    {hot_selection}""",
+                (month, following)
+            )
+            arc.execute("COMMIT")
+            arc.execute("DETACH DATABASE hot")
+            arc.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            arc.execute("VACUUM")
+        finally:
+            arc.close()
+        os.replace(tmp, final)
+        os.chmod(final, 0o444)
+        created = True
+
+    # Remove do banco quente só o que de fato está no arquivo; um mês recém
+    # selado usa o .db antes de compactar, sem descompactar de novo
+    with _archive_file(final if final.exists() else packed) as archive, _lock:
+        con = _writer_conn()
+        con.execute("ATTACH DATABASE ? AS arc", (archive.as_uri() + "?mode=ro",))
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                moved = con.execute(
+                    "DELETE FROM event_rows WHERE ts >= ? AND ts < ? "
+                    "AND id IN (SELECT id FROM arc.event_rows)",
+                    (month, following)
+                ).rowcount
+                con.execute("COMMIT")
+                _bump_version()
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        finally:
+            con.execute("DETACH DATABASE arc")
+
+    if compress and created:
+        with open(final, "rb") as src, gzip.open(packed.with_suffix(".tmp"), "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(packed.with_suffix(".tmp"), packed)
+        final.unlink()
+    # Linhas atrasadas de um mês já selado ficam no banco quente
+    return moved
+
+
+# Planos esperados para as consultas quentes: (nome, SQL, params, trecho do plano)
+QUERY_PLAN_CHECKS = (
+    ("fetch_events por intervalo",
+     "SELECT id, ts, type, title, detail, duration FROM events_live "
+     "WHERE ts >= ? AND ts <= ? ORDER BY ts ASC, id ASC LIMIT ?",
+     (0, 1, 10), "USING INDEX idx_ts"),
+    ("fetch_events filtrado por tipo",
+     "SELECT id, ts, type, title, detail, duration FROM events_live "
+     "WHERE ts >= ? AND ts <= ? AND type IN (?) ORDER BY ts ASC, id ASC LIMIT ?",
+     (0, 1, "window", 10), "USING INDEX idx_type_ts"),
+    # Mesma consulta por banco de fetch_rollup (/api/stats), com filtro de tipo
+    ("fetch_rollup por intervalo e tipo",
+     "SELECT r.type, COALESCE(s.value, '') AS title, r.duration, r.events "
+     "FROM rollup_hourly r LEFT JOIN strings s ON s.id = r.title_id "
+     "WHERE r.bucket >= ? AND r.bucket < ? AND r.type IN (?)",
+     (0, 1, "window"), "SEARCH r USING PRIMARY KEY (bucket>? AND bucket<?)"),
+    ("fetch_rollup: pontas fora da hora",
+     "SELECT r.type, COALESCE(s.value, '') AS title, COALESCE(r.duration, 0), 1 "
+     "FROM event_rows r LEFT JOIN strings s ON s.id = r.title_id "
+     "WHERE r.ts >= ? AND r.ts < ? AND r.type IN (?)",
+     (0, 1, "window"), "INDEX idx_type_ts (type=? AND ts>? AND ts<?)"),
+    ("busca: eventos de um título",
+     "SELECT id, ts, type, title_id, detail_id, duration FROM event_rows WHERE title_id = ? AND ts >= ? AND ts <= ?",
+     (1, 0, 1), "USING INDEX idx_title_ts"),
+    ("rollups por intervalo",
+     "SELECT type, title_id, duration, events FROM rollup_hourly WHERE bucket >= ? AND bucket <= ?",
+     (0, 1), "USING PRIMARY KEY"),
+)
+
+def check_query_plans():
+    """
+    Roda EXPLAIN QUERY PLAN nas consultas de QUERY_PLAN_CHECKS e devolve
+    [(nome, plano, ok)]. Um ok=False indica que o índice deixou de ser usado.
+    """
+    results = []
+    with read_conn() as c:
+        for name, sql, params, expected in QUERY_PLAN_CHECKS:
+            plan = " | ".join(r[3] for r in c.execute("EXPLAIN QUERY PLAN " + sql, params))
+            results.append((name, plan, expected in plan))
+    return results
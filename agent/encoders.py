@@ -0,0 +1,115 @@
+# agent/encoders.py
+"""
+Codificação de eventos para /api/events.
+
+As linhas chegam do cursor como tuplas (id, ts, type, title, detail,
+duration). Os formatos compactos codificam essas tuplas direto, sem montar
+um dict por linha:
+
+  - json      lista de objetos (padrão), via orjson quando instalado
+  - columnar  JSON com um array por campo
+  - msgpack   {"fields": [...], "rows": [[...], ...]} (pip install msgpack)
+  - arrow     stream IPC do Apache Arrow (pip install pyarrow)
+
+O cursor da próxima página vai no próprio corpo (next_cursor) e, no Arrow,
+nos metadados do schema.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack é opcional
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pyarrow é opcional
+    pyarrow = None
+
+FIELDS = ("id", "ts", "type", "title", "detail", "duration")
+
+MIMETYPES = {
+    "json": "application/json",
+    "columnar": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def dumps(obj):
+    """JSON em bytes UTF-8; orjson se disponível"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def available(fmt):
+    """Formato conhecido e com a dependência instalada"""
+    if fmt == "msgpack":
+        return msgpack is not None
+    if fmt == "arrow":
+        return pyarrow is not None
+    return fmt in MIMETYPES
+
+
+def _columns(rows):
+    # zip(*rows) transpõe as tuplas; sem linhas, colunas vazias
+    return [list(col) for col in zip(*rows)] if rows else [[] for _ in FIELDS]
+
+
+def encode_json(rows, next_cursor):
+    return dumps({"events": [dict(zip(FIELDS, r)) for r in rows], "next_cursor": next_cursor})
+
+
+def encode_columnar(rows, next_cursor):
+    return dumps({
+        "fields": FIELDS,
+        "columns": dict(zip(FIELDS, _columns(rows))),
+        "count": len(rows),
+        "next_cursor": next_cursor,
+    })
+
+
+def encode_msgpack(rows, next_cursor):
+    # Tuplas viram arrays do msgpack sem conversão
+    return msgpack.packb({"fields": FIELDS, "rows": rows, "next_cursor": next_cursor})
+
+
+_arrow_schema = None
+
+
+def encode_arrow(rows, next_cursor):
+    global _arrow_schema
+    if _arrow_schema is None:
+        _arrow_schema = pyarrow.schema([
+            ("id", pyarrow.int64()), ("ts", pyarrow.int64()), ("type", pyarrow.string()),
+            ("title", pyarrow.string()), ("detail", pyarrow.string()), ("duration", pyarrow.int64()),
+        ])
+    schema = _arrow_schema.with_metadata({"next_cursor": next_cursor or ""})
+    batch = pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(col, type=field.type) for col, field in zip(_columns(rows), schema)],
+        schema=schema,
+    )
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {
+    "json": encode_json,
+    "columnar": encode_columnar,
+    "msgpack": encode_msgpack,
+    "arrow": encode_arrow,
+}
+
+
+def encode(fmt, rows, next_cursor=None):
+    """Página de eventos no formato pedido, em bytes"""
+    return ENCODERS[fmt](rows, next_cursor)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# agent/export.py
+"""
+Exportação do logbook em Markdown para qualquer período.
+
+O documento é gerado aos pedaços (generator), lendo os eventos página a
+página, então a memória fica constante mesmo para um ano inteiro.
+
+Uso:
+    python3 export.py --start 2024-01-01 --end 2024-12-31 --coalesce --gzip -o 2024.md.gz
+"""
+import argparse
+import sys
+import time
+import zlib
+from datetime import datetime
+
+from db import fetch_rollup, init_db, iter_events
+
+# Config
+COALESCE_GAP = 60      # segundos entre eventos iguais para juntar numa sessão
+CHUNK_SIZE = 64 * 1024  # bytes acumulados antes de entregar um pedaço
+
+
+def parse_local(value):
+    """
+    Converte "AAAA-MM-DD", "AAAA-MM-DD HH:MM[:SS]" (horário local) ou um
+    timestamp unix em segundos desde a época.
+    """
+    value = str(value).strip()
+    if value.lstrip("-").isdigit():
+        return int(value)
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(value, fmt).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date: {value!r}")
+
+
+def local_midnight(ts=None):
+    """Meia-noite local do dia de `ts` (padrão: hoje)"""
+    t = time.localtime(ts if ts is not None else time.time())
+    return int(time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1)))
+
+
+def parse_range(start=None, end=None):
+    """
+    (start_ts, end_ts) a partir de valores em horário local. Sem início, usa
+    hoje 00:00; sem fim, agora. Um fim só com data inclui o dia inteiro.
+    """
+    start_ts = parse_local(start) if start else local_midnight()
+    end_ts = parse_local(end) if end else int(time.time())
+    if end and len(str(end).strip()) == 10 and "-" in str(end):
+        end_ts = local_midnight(end_ts + 86400 + 3600) - 1
+    return start_ts, end_ts
+
+
+def _fmt_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes}min"
+    if minutes:
+        return f"{minutes}min {secs}s"
+    return f"{secs}s"
+
+
+def _sessions(rows, gap):
+    """
+    Junta eventos consecutivos com mesmo tipo e título em sessões
+    (ts, fim, tipo, título, duração, eventos), desde que o próximo comece
+    até `gap` segundos depois do fim do anterior.
+    """
+    current = None
+    for _id, ts, typ, title, _detail, dur in rows:
+        dur = dur or 0
+        if (current and current[2] == typ and current[3] == title
+                and ts <= current[1] + gap):
+            current[1] = max(current[1], ts + dur)
+            current[4] += dur
+            current[5] += 1
+            continue
+        if current:
+            yield tuple(current)
+        current = [ts, ts + dur, typ, title, dur, 1]
+    if current:
+        yield tuple(current)
+
+
+def iter_markdown(start_ts, end_ts, coalesce=False, gap=COALESCE_GAP):
+    """Gera o Markdown do período em pedaços de ~CHUNK_SIZE bytes"""
+    buf = []
+    size = 0
+
+    def emit(line):
+        nonlocal size
+        buf.append(line)
+        size += len(line) + 1
+
+    start_str = time.strftime("%Y-%m-%d %H:%M", time.localtime(start_ts))
+    end_str = time.strftime("%Y-%m-%d %H:%M", time.localtime(end_ts))
+    emit("# Logbook\n")
+    emit(f"_Período: {start_str} → {end_str}_\n")
+
+    totals = fetch_rollup(start_ts, end_ts)
+    if totals:
+        emit("## Totais\n")
+        for typ, title, dur, count in sorted(totals, key=lambda x: x[2], reverse=True)[:10]:
+            emit(f"- [{typ}] {title or 'unknown'} — {_fmt_duration(dur)} ({count} eventos)")
+
+    rows = iter_events(start_ts, end_ts)
+    current_day = None
+    if coalesce:
+        for ts, end, typ, title, dur, count in _sessions(rows, gap):
+            day = time.strftime("%Y-%m-%d", time.localtime(ts))
+            if day != current_day:
+                emit(f"\n## {day}\n")
+                current_day = day
+            t0 = time.strftime("%H:%M", time.localtime(ts))
+            t1 = time.strftime("%H:%M", time.localtime(end))
+            suffix = f" ({count} eventos)" if count > 1 else ""
+            emit(f"- **{t0}–{t1}** [{typ}] {title or ''} — {_fmt_duration(dur)}{suffix}")
+            if size >= CHUNK_SIZE:
+                yield "\n".join(buf) + "\n"
+                buf.clear()
+                size = 0
+    else:
+        for r in rows:
+            ts = r[1]
+            day = time.strftime("%Y-%m-%d", time.localtime(ts))
+            if day != current_day:
+                emit(f"\n## {day}\n")
+                current_day = day
+            tstr = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+            typ = r[2]
+            title = r[3] or ""
+            detail = r[4] or ""
+            dur = r[5] or 0
+            emit(f"- **{tstr}** [{typ}] {title} — {detail} — {dur}s")
+            if size >= CHUNK_SIZE:
+                yield "\n".join(buf) + "\n"
+                buf.clear()
+                size = 0
+
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+def gzip_chunks(chunks):
+    """Compacta um stream de texto em gzip sem juntar tudo na memória"""
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for chunk in chunks:
+        data = comp.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield comp.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o logbook em Markdown")
+    parser.add_argument("--start", help="início em horário local (padrão: hoje 00:00)")
+    parser.add_argument("--end", help="fim em horário local (padrão: agora)")
+    parser.add_argument("--coalesce", action="store_true", help="junta eventos repetidos em sessões")
+    parser.add_argument("--gzip", action="store_true", help="compacta a saída com gzip")
+    parser.add_argument("-o", "--output", help="arquivo de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    try:
+        start_ts, end_ts = parse_range(args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+
+    init_db()
+    chunks = iter_markdown(start_ts, end_ts, coalesce=args.coalesce)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        if args.gzip:
+            for data in gzip_chunks(chunks):
+                out.write(data)
+        else:
+            for chunk in chunks:
+                out.write(chunk.encode("utf-8"))
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
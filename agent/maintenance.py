@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# agent/maintenance.py
+"""
+Tarefas de manutenção do banco de dados.
+
+Uso:
+    python3 maintenance.py migrate
+    python3 maintenance.py rebuild-rollups
+    python3 maintenance.py rebuild-search
+    python3 maintenance.py check-plans
+    python3 maintenance.py rotate [--compress]
+    python3 maintenance.py import-history [--path term_history.log]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from db import (
+    DB_PATH, check_query_plans, init_db, rebuild_rollups, rebuild_search_index, rotate_partitions, vacuum,
+)
+from shell_ingest import HISTORY_PATH, import_history
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+
+def cmd_migrate(args):
+    # init_db() já migrou o esquema; VACUUM devolve o espaço dos textos repetidos
+    size_before = DB_PATH.stat().st_size
+    vacuum()
+    size_after = DB_PATH.stat().st_size
+    logging.info(f"Database compacted: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+
+def cmd_rebuild_rollups(args):
+    started = time.time()
+    buckets = rebuild_rollups()
+    logging.info(f"Rollups rebuilt: {buckets} rows in {time.time() - started:.2f}s")
+
+
+def cmd_rebuild_search(args):
+    started = time.time()
+    texts = rebuild_search_index()
+    logging.info(f"Search index rebuilt: {texts} texts in {time.time() - started:.2f}s")
+
+
+def cmd_check_plans(args):
+    failed = 0
+    for name, plan, ok in check_query_plans():
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {plan}")
+        failed += not ok
+    if failed:
+        sys.exit(f"{failed} query plan(s) regressed")
+
+
+def cmd_rotate(args):
+    started = time.time()
+    sealed = rotate_partitions(compress=args.compress)
+    for month, count in sealed:
+        logging.info(f"Sealed {month}: {count} events archived")
+    if not sealed:
+        logging.info("Nothing to rotate")
+    logging.info(f"Rotation finished in {time.time() - started:.2f}s")
+
+
+def cmd_import_history(args):
+    started = time.time()
+    imported = import_history(args.path, f"{args.path}.offset")
+    logging.info(f"Imported {imported} commands from {args.path} in {time.time() - started:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do banco do Activity Tracker")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="atualiza o esquema para a versão atual e compacta o arquivo")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("rebuild-rollups", help="recalcula rollup_hourly a partir dos eventos brutos")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("rebuild-search", help="reconstrói o índice da busca textual (títulos e detalhes)")
+    p.set_defaults(func=cmd_rebuild_search)
+
+    p = sub.add_parser("check-plans", help="confere se as consultas quentes ainda usam os índices")
+    p.set_defaults(func=cmd_check_plans)
+
+    p = sub.add_parser("rotate", help="arquiva os meses anteriores ao corrente em archive/")
+    p.add_argument("--compress", action="store_true", help="grava os arquivos como .db.gz")
+    p.set_defaults(func=cmd_rotate)
+
+    p = sub.add_parser("import-history", help="importa o term_history.log a partir do último offset salvo")
+    p.add_argument("--path", default=str(HISTORY_PATH), help=f"arquivo de histórico (padrão: {HISTORY_PATH})")
+    p.set_defaults(func=cmd_import_history)
+
+    args = parser.parse_args()
+    init_db()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# agent/metrics.py
+"""
+Instrumentação interna do tracker.
+
+Histogramas com buckets fixos: observar custa um bisect e uma soma sob um
+lock, então ficam sempre ligados. Contadores simples (ex.: acertos do
+cache) usam o mesmo registro. Cada processo tem seu próprio registro;
+o agente grava um snapshot em JSON de tempos em tempos e a API junta esse
+arquivo às suas métricas em /api/metrics (formato texto do Prometheus).
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PREFIX = "activity_tracker_"
+# Limites superiores (segundos) dos buckets padrão
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SNAPSHOT_MAX_AGE = 900  # snapshot do agente mais velho que isso é ignorado
+AGENT_SNAPSHOT = "agent_metrics.json"  # ao lado do banco
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels (tupla ordenada) -> [contagens..., soma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Um contador por bucket, mais o +Inf, mais a soma
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco `with`"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            series = [
+                {"labels": dict(key), "counts": values[:-1], "sum": values[-1]}
+                for key, values in self._series.items()
+            ]
+        return {"name": self.name, "help": self.help, "buckets": list(self.buckets), "series": series}
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._series = {}   # labels (tupla ordenada) -> valor
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            series = [{"labels": dict(key), "value": value} for key, value in self._series.items()]
+        return {"name": self.name, "help": self.help, "type": "counter", "series": series}
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    """Histograma registrado com esse nome (criado no primeiro uso)"""
+    with _registry_lock:
+        hist = _registry.get(name)
+        if hist is None:
+            hist = _registry[name] = Histogram(name, help_text, buckets)
+        return hist
+
+
+def counter(name, help_text):
+    """Contador registrado com esse nome (criado no primeiro uso)"""
+    with _registry_lock:
+        ctr = _registry.get(name)
+        if ctr is None:
+            ctr = _registry[name] = Counter(name, help_text)
+        return ctr
+
+
+def snapshot():
+    """Estado atual de todas as métricas do processo"""
+    with _registry_lock:
+        hists = list(_registry.values())
+    return [h.snapshot() for h in hists]
+
+
+def quantile(buckets, counts, q):
+    """Estimativa do quantil q por interpolação linear dentro do bucket"""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if i >= len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i else 0.0
+            return lower + (buckets[i] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+def summary_lines(snap=None):
+    """Uma linha legível por série (contagem, média, p50, p99), para o log"""
+    lines = []
+    for hist in snap if snap is not None else snapshot():
+        if hist.get("type") == "counter":
+            for series in hist["series"]:
+                labels = ",".join(f"{k}={v}" for k, v in sorted(series["labels"].items()))
+                name = f"{hist['name']}{{{labels}}}" if labels else hist["name"]
+                lines.append(f"{name} {series['value']}")
+            continue
+        for series in hist["series"]:
+            count = sum(series["counts"])
+            if not count:
+                continue
+            labels = ",".join(f"{k}={v}" for k, v in sorted(series["labels"].items()))
+            name = f"{hist['name']}{{{labels}}}" if labels else hist["name"]
+            p50 = quantile(hist["buckets"], series["counts"], 0.5)
+            p99 = quantile(hist["buckets"], series["counts"], 0.99)
+            lines.append(
+                f"{name} n={count} avg={series['sum'] / count * 1000:.2f}ms "
+                f"p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms"
+            )
+    return lines
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+def render(sources):
+    """
+    Texto no formato de exposição do Prometheus. `sources` é uma lista de
+    (snapshot, labels extras); séries de mesmo nome são agrupadas numa só
+    família, como o formato exige.
+    """
+    families = {}
+    for snap, extra in sources:
+        for hist in snap:
+            family = families.setdefault(hist["name"], (hist, []))
+            for series in hist["series"]:
+                family[1].append((hist.get("buckets"), dict(series["labels"], **extra), series))
+
+    out = []
+    for name, (hist, entries) in sorted(families.items()):
+        metric = PREFIX + name
+        kind = hist.get("type", "histogram")
+        out.append(f"# HELP {metric} {hist['help']}")
+        out.append(f"# TYPE {metric} {kind}")
+        for buckets, labels, series in entries:
+            if kind == "counter":
+                out.append(f"{metric}{_fmt_labels(labels)} {series['value']}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], series["counts"]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                out.append(f"{metric}_bucket{_fmt_labels(dict(labels, le=le))} {cumulative}")
+            out.append(f"{metric}_sum{_fmt_labels(labels)} {series['sum']}")
+            out.append(f"{metric}_count{_fmt_labels(labels)} {cumulative}")
+    return "\n".join(out) + "\n"
+
+
+def write_snapshot(path):
+    """Grava o snapshot do processo de forma atômica (tmp + rename)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"ts": time.time(), "metrics": snapshot()}, f)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, max_age=SNAPSHOT_MAX_AGE):
+    """Snapshot gravado por outro processo, ou [] se ausente ou velho demais"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if time.time() - data.get("ts", 0) > max_age:
+        return []
+    return data.get("metrics", [])
@@ -0,0 +1,126 @@
+# agent/procinfo.py
+"""
+Metadados do processo dono da janela focada (executável, cmdline, cwd).
+
+Cada processo custa uma leitura completa de /proc por tempo de vida: o
+resultado fica num LRU indexado por (window id, pid) e só é refeito quando
+o pid some ou é reaproveitado por outro processo (starttime diferente).
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+# Config
+PROC_CACHE_SIZE = 256    # processos distintos guardados
+MAX_CMDLINE_LEN = 200    # caracteres da cmdline levados para o detail
+
+
+class ProcessInfo:
+    __slots__ = ("pid", "starttime", "exe", "cmdline", "cwd")
+
+    def __init__(self, pid, starttime, exe, cmdline, cwd):
+        self.pid = pid
+        self.starttime = starttime
+        self.exe = exe
+        self.cmdline = cmdline
+        self.cwd = cwd
+
+    def detail(self):
+        """Texto para a coluna detail: "pid:N exe:nome cwd:/caminho cmd:..." """
+        parts = [f"pid:{self.pid}"]
+        if self.exe:
+            parts.append(f"exe:{self.exe}")
+        if self.cwd:
+            parts.append(f"cwd:{self.cwd}")
+        if self.cmdline:
+            parts.append(f"cmd:{self.cmdline}")
+        return " ".join(parts)
+
+
+def _starttime(pid):
+    """Início do processo em ticks desde o boot (campo 22 de /proc/<pid>/stat)"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # comm (campo 2) pode conter espaços e parênteses: corta depois do último ")"
+    fields = stat[stat.rfind(b")") + 2:].split()
+    try:
+        return int(fields[19])
+    except (IndexError, ValueError):
+        return None
+
+
+def _read(pid, starttime):
+    def readlink(name):
+        try:
+            return os.readlink(f"/proc/{pid}/{name}")
+        except OSError:
+            return None
+
+    exe = readlink("exe")
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            raw = f.read()
+        # Argumentos separados por NUL; quebras de linha viram espaço
+        cmdline = " ".join(raw.decode("utf-8", "replace").replace("\0", " ").split())
+    except OSError:
+        cmdline = None
+    if not exe and cmdline:
+        exe = cmdline.split(" ", 1)[0]
+    return ProcessInfo(
+        pid,
+        starttime,
+        os.path.basename(exe) if exe else None,
+        cmdline[:MAX_CMDLINE_LEN] if cmdline else None,
+        readlink("cwd"),
+    )
+
+
+class ProcessCache:
+    """LRU (window id, pid) -> ProcessInfo, validado pelo starttime do pid"""
+
+    def __init__(self, maxsize=PROC_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, window_id, pid):
+        if not pid:
+            return None
+        starttime = _starttime(pid)
+        key = (window_id, pid)
+        with self._lock:
+            if starttime is None:
+                # Processo já saiu
+                self._entries.pop(key, None)
+                return None
+            info = self._entries.get(key)
+            if info is not None and info.starttime == starttime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return info
+        info = _read(pid, starttime)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        logging.debug(f"Process metadata cached: {info.detail()}")
+        return info
+
+
+_cache = ProcessCache()
+
+
+def process_detail(window_id, pid):
+    """Detail de um evento de janela a partir do pid (ou "no_pid")"""
+    info = _cache.get(window_id, pid)
+    if info is not None:
+        return info.detail()
+    return f"pid:{pid}" if pid else "no_pid"
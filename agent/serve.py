@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# agent/serve.py
+"""
+Modo de produção da API.
+
+Roda o app Flask de api.py no waitress: várias threads de trabalho,
+keep-alive e limites de tamanho de requisição. Uma exportação lenta
+ocupa só uma thread, então os POSTs de eventos continuam sendo atendidos.
+Por padrão escuta apenas em localhost; --unix-socket troca a porta TCP por
+um socket Unix.
+
+Uso:
+    python3 serve.py [--host 127.0.0.1] [--port 5001] [--threads 8]
+    python3 serve.py --unix-socket ~/.activity_tracker/api.sock
+
+Sem o waitress instalado (pip install waitress), cai para o servidor
+threaded do Werkzeug, com um aviso.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+
+from api import MAX_CONTENT_LENGTH, app, set_stream_limit
+
+try:
+    import waitress
+except ImportError:  # waitress é opcional
+    waitress = None
+
+# Config
+API_HOST = "127.0.0.1"
+API_PORT = 5001
+API_THREADS = 8           # requisições atendidas em paralelo
+CHANNEL_TIMEOUT = 120     # segundos até fechar uma conexão keep-alive ociosa
+CONNECTION_LIMIT = 100    # conexões simultâneas aceitas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a API do Activity Tracker")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", API_HOST))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", API_PORT)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("API_THREADS", API_THREADS)))
+    parser.add_argument("--unix-socket", help="escuta neste socket Unix em vez de host:porta")
+    args = parser.parse_args()
+
+    # Metade das threads para /api/stream; a outra metade atende o resto
+    set_stream_limit(args.threads // 2)
+
+    # SIGTERM vira SystemExit para que o atexit do writer grave a fila
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
+
+    if waitress is None:
+        if args.unix_socket:
+            sys.exit("--unix-socket requires waitress (pip install waitress)")
+        logging.warning("waitress not installed, using Werkzeug's threaded server")
+        app.run(host=args.host, port=args.port, threaded=True, debug=False)
+        return
+
+    options = dict(
+        threads=args.threads,
+        channel_timeout=CHANNEL_TIMEOUT,
+        connection_limit=CONNECTION_LIMIT,
+        max_request_body_size=MAX_CONTENT_LENGTH,
+        ident="activity-tracker",
+    )
+    if args.unix_socket:
+        socket_path = os.path.expanduser(args.unix_socket)
+        logging.info(f"Starting Activity Tracker API on unix:{socket_path} ({args.threads} threads)")
+        waitress.serve(app, unix_socket=socket_path, unix_socket_perms="600", **options)
+    else:
+        logging.info(f"Starting Activity Tracker API on {args.host}:{args.port} ({args.threads} threads)")
+        waitress.serve(app, host=args.host, port=args.port, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# agent/shell_ingest.py
+"""
+Entrada de comandos do shell.
+
+O hook (scripts/log_command.sh) entrega cada comando, sem criar processos
+por comando, no socket Unix ~/.activity_tracker/ingest.sock (0600: só o
+próprio usuário escreve):
+  - zsh: direto, com zsocket
+  - bash: por scripts/shell_forward.py, um encaminhador por shell
+
+Protocolo: uma linha por comando, "ts|host|comando". Um prefixo com o número
+do histórico ("  512  ts|host|cmd", saída de `history 1` do bash) é aceito.
+Com o agente parado, o hook grava no term_history.log no mesmo formato
+("ts|terminal|cmd" no arquivo antigo), importado por import_history() a
+partir do último offset salvo.
+"""
+import asyncio
+import logging
+import os
+import re
+import socket
+from pathlib import Path
+
+from db import insert_events, iter_events
+
+# Config
+INGEST_DIR = Path.home() / ".activity_tracker"
+INGEST_SOCKET = INGEST_DIR / "ingest.sock"
+HISTORY_PATH = INGEST_DIR / "term_history.log"
+OFFSET_PATH = INGEST_DIR / "term_history.log.offset"
+MAX_COMMAND_LEN = 4096      # caracteres guardados por comando
+IMPORT_BATCH = 1000         # comandos por transação na importação
+
+_LINE = re.compile(r"^\s*(?:\d+\*?\s+)?(\d+)\|([^|]*)\|(.*)$")
+
+
+def parse_line(line, default_host):
+    """Linha do protocolo -> (ts, host, comando), ou None se inválida"""
+    m = _LINE.match(line.rstrip("\r\n"))
+    if not m:
+        return None
+    ts, host, cmd = m.groups()
+    cmd = cmd.strip()
+    # Ignora comandos vazios ou muito pequenos
+    if len(cmd) < 2:
+        return None
+    if not host or host == "terminal":
+        host = default_host
+    return int(ts), host, cmd[:MAX_COMMAND_LEN]
+
+
+async def start_servers(publish, socket_path=INGEST_SOCKET):
+    """
+    Abre o socket Unix; publish(bytes) recebe cada linha. Devolve uma
+    corrotina que fecha tudo.
+    """
+    async def on_client(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                publish(line)
+        except (ConnectionError, ValueError) as e:
+            logging.debug(f"Shell ingest client dropped: {e}")
+        finally:
+            writer.close()
+
+    # Socket de uma execução anterior que morreu sem limpar
+    try:
+        os.unlink(socket_path)
+    except FileNotFoundError:
+        pass
+    # Criado já sem acesso para outros usuários: um chmod depois do bind
+    # deixaria uma janela para outro usuário conectar e injetar comandos.
+    # O umask vale para o processo todo, então fica restrito ao bind
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        sock.bind(str(socket_path))
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    server = await asyncio.start_unix_server(on_client, sock=sock)
+    logging.info(f"Shell ingest listening on {socket_path}")
+
+    async def close():
+        server.close()
+        await server.wait_closed()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+    return close
+
+
+def _load_offset(path, st):
+    try:
+        inode, offset = (int(x) for x in Path(path).read_text().split())
+    except (OSError, ValueError):
+        return 0
+    # Arquivo trocado ou truncado: recomeça do início
+    if inode != st.st_ino or offset > st.st_size:
+        return 0
+    return offset
+
+
+def _save_offset(path, inode, offset):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{inode} {offset}\n")
+    os.replace(tmp, path)
+
+
+def _insert_new(batch):
+    # Linhas antigas também foram enviadas à API pelo hook anterior:
+    # pula as que já existem com o mesmo ts e comando
+    lo = min(row[0] for row in batch)
+    hi = max(row[0] for row in batch)
+    existing = {(r[1], r[4]) for r in iter_events(lo, hi, types=("terminal",))}
+    rows = [row for row in batch if (row[0], row[3]) not in existing]
+    if rows:
+        insert_events(rows)
+    return len(rows)
+
+
+def import_history(path=HISTORY_PATH, offset_path=OFFSET_PATH):
+    """
+    Importa o term_history.log a partir do último offset salvo, em lotes de
+    IMPORT_BATCH por transação. Devolve quantos comandos foram gravados.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    offset = _load_offset(offset_path, st)
+    host = socket.gethostname()
+    imported = 0
+    batch = []
+
+    def add(line):
+        parsed = parse_line(line, host)
+        if parsed:
+            ts, cmd_host, cmd = parsed
+            batch.append((ts, "terminal", cmd_host, cmd, 0))
+
+    # Comando ainda aberto: o bash grava `history 1` direto aqui quando o
+    # encaminhador não está rodando, e as linhas de continuação de um comando
+    # com várias linhas vêm sem o "ts|host|"; elas são juntadas com espaço
+    pending, pending_at = None, offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # linha ainda sendo escrita
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if pending is not None and not _LINE.match(line):
+                pending += " " + line.strip()
+            else:
+                if pending is not None:
+                    add(pending)
+                pending, pending_at = line, offset
+            offset += len(raw)
+            if len(batch) >= IMPORT_BATCH:
+                imported += _insert_new(batch)
+                batch.clear()
+                # O comando aberto ainda não foi gravado: é relido na próxima vez
+                _save_offset(offset_path, st.st_ino, pending_at)
+    if pending is not None:
+        add(pending)
+    if batch:
+        imported += _insert_new(batch)
+    _save_offset(offset_path, st.st_ino, offset)
+    return imported
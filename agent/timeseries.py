@@ -0,0 +1,125 @@
+# agent/timeseries.py
+"""
+Séries temporais para gráficos: tempo por bucket (minute, hour, day,
+week) agrupado por tipo, título ou categoria.
+
+Os limites dos buckets são calculados aqui no fuso local, com horário de
+verão (um dia pode ter 23 ou 25 horas; a semana começa na segunda). A
+agregação roda no SQL (db.fetch_timeseries): hour/day/week leem
+rollup_hourly, então um ano inteiro custa alguns milhares de linhas já
+somadas (em fusos de meia hora, as meias horas das pontas vêm de
+event_rows); minute lê event_rows e por isso é limitado a MAX_BUCKETS.
+"""
+import heapq
+import time
+from datetime import date, timedelta
+
+from categorizer import categorize
+from db import fetch_timeseries
+
+# Config
+BUCKETS = ("minute", "hour", "day", "week")
+GROUP_BY = ("type", "title", "category")
+MAX_BUCKETS = 10000     # buckets por consulta (~1 semana de minutos, 1 ano de horas)
+DEFAULT_TOP = 10        # grupos por bucket; o resto vai para other_seconds
+
+_SIZES = {"minute": 60, "hour": 3600}
+
+
+def _local_midnight(d):
+    # isdst=-1: a libc decide se o horário de verão vale naquela data
+    return int(time.mktime((d.year, d.month, d.day, 0, 0, 0, 0, 0, -1)))
+
+
+def bucket_bounds(start, end, bucket):
+    """
+    [[início, fim), ...] dos buckets que cobrem [start, end]. Levanta
+    ValueError se passar de MAX_BUCKETS.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if end < start:
+        raise ValueError("end must be >= start")
+    size = _SIZES.get(bucket)
+    if size:
+        # Alinhado à hora/minuto local; o offset do fuso vem de tm_gmtoff
+        lo = start - (start + time.localtime(start).tm_gmtoff) % size
+        count = (end - lo) // size + 1
+        if count > MAX_BUCKETS:
+            raise ValueError(f"too many buckets ({count} > {MAX_BUCKETS}), use a larger bucket")
+        return [[lo + i * size, lo + (i + 1) * size] for i in range(count)]
+
+    day = date.fromtimestamp(start)
+    step = timedelta(days=7 if bucket == "week" else 1)
+    if bucket == "week":
+        day -= timedelta(days=day.weekday())
+    last = date.fromtimestamp(end)
+    if (last - day) // step + 1 > MAX_BUCKETS:
+        raise ValueError(f"too many buckets (> {MAX_BUCKETS}), use a larger bucket")
+    bounds = []
+    lo = _local_midnight(day)
+    while lo <= end:
+        day += step
+        hi = _local_midnight(day)
+        bounds.append([lo, hi])
+        lo = hi
+    return bounds
+
+
+def validate(start, end, bucket, group_by):
+    """Confere os parâmetros (ValueError com a mensagem) e devolve os limites dos buckets"""
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+    return bucket_bounds(start, end, bucket)
+
+
+def timeseries(start, end, bucket="hour", group_by="type", top=DEFAULT_TOP, types=None):
+    """
+    {"bucket", "group_by", "start", "end", "buckets": [...]} com um item por
+    bucket (inclusive vazios): ts, label local, seconds, events, os `top`
+    grupos com mais tempo e o restante somado em other_seconds/other_events.
+    """
+    bounds = validate(start, end, bucket, group_by)
+    rows = fetch_timeseries(
+        bounds, by_title=group_by != "type", types=types, raw=bucket == "minute"
+    )
+
+    groups = {}   # bucket -> chave -> [segundos, eventos]
+    for lo, typ, title, dur, events in rows:
+        if group_by == "type":
+            key = typ
+        elif group_by == "title":
+            key = title or ""
+        else:
+            # Rollups não guardam o detalhe: a categoria sai de tipo + título
+            key = categorize(typ, title or "", "")
+        acc = groups.setdefault(lo, {}).setdefault(key, [0, 0])
+        acc[0] += dur
+        acc[1] += events
+
+    label_fmt = "%Y-%m-%d %H:%M" if bucket in _SIZES else "%Y-%m-%d"
+    out = []
+    for lo, _hi in bounds:
+        by_key = groups.get(lo, {})
+        best = heapq.nlargest(top, by_key.items(), key=lambda kv: kv[1][0])
+        seconds = sum(v[0] for v in by_key.values())
+        events = sum(v[1] for v in by_key.values())
+        top_seconds = sum(v[0] for _, v in best)
+        top_events = sum(v[1] for _, v in best)
+        out.append({
+            "ts": lo,
+            "label": time.strftime(label_fmt, time.localtime(lo)),
+            "seconds": seconds,
+            "events": events,
+            "groups": [{"key": k, "seconds": v[0], "events": v[1]} for k, v in best],
+            "other_seconds": seconds - top_seconds,
+            "other_events": events - top_events,
+        })
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "start": bounds[0][0],
+        "end": bounds[-1][1],
+        "top": top,
+        "buckets": out,
+    }
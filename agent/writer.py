@@ -0,0 +1,401 @@
+# agent/writer.py
+"""
+Escritor em background para eventos.
+
+Produtores (agent.main_loop, API) apenas enfileiram operações num buffer
+limitado em memória; uma thread dedicada agrupa tudo que chegou dentro da
+janela de flush em uma única transação, pagando um commit por lote em vez
+de um por evento.
+
+Se o banco ficar indisponível (lock preso, disco) ou o buffer encher, as
+operações vão para um journal local append-only (spill-<nome>.jsonl ao lado
+do banco), reaplicado em ordem assim que o banco volta ou na próxima
+inicialização. Enfileirar nunca espera pelo SQLite.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from db import DB_PATH, conn, insert_event_row
+
+# Config
+FLUSH_INTERVAL = 1.0   # latência máxima (s) entre enfileirar e gravar
+MAX_BATCH = 500        # flush imediato ao acumular N operações
+MAX_BUFFER = 10000     # operações em memória antes de transbordar para o journal
+SPILL_RETRY_SEC = 10   # intervalo entre tentativas de reaplicar o journal
+
+_ref_prefix = f"{os.getpid():x}.{int(time.time()):x}."
+_ref_counter = itertools.count()
+
+
+class PendingEvent:
+    """
+    Referência a um evento enfileirado; `id` é preenchido após o commit.
+    `ref` identifica o evento no journal antes de ele ter um id.
+    """
+    __slots__ = ("id", "ref", "_done")
+
+    def __init__(self, ref=None):
+        self.id = None
+        self.ref = ref or f"{_ref_prefix}{next(_ref_counter)}"
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Bloqueia até o lote ser gravado e devolve o id (ou None)"""
+        self._done.wait(timeout)
+        return self.id
+
+
+class _Control:
+    # Marcador no buffer: força flush imediato e, opcionalmente, encerra a thread
+    __slots__ = ("stop", "done")
+
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+class EventWriter:
+    def __init__(self, name="default", flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH,
+                 max_buffer=MAX_BUFFER, spill_path=None):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_buffer = max_buffer
+        self.spill_path = spill_path or DB_PATH.parent / f"spill-{name}.jsonl"
+        # Operações são (seq, tipo, ref, valor); seq dá a ordem no replay
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._thread = None
+        # Estado do journal. Ordem de locks: _cond antes de _journal_lock
+        self._journal_lock = threading.Lock()
+        self._spilling = False
+        self._spill_pending = 0      # produtores escrevendo no journal agora
+        self._spill_refs = {}        # ref -> PendingEvent vivo citado no journal
+        self._next_replay = 0.0
+
+    def start(self):
+        if self._thread is None:
+            last_seq = self._journal_last_seq()
+            if last_seq is not None:
+                # Sobras da execução anterior: continuam a sequência e vão primeiro
+                self._seq = itertools.count(last_seq + 1)
+                self._spilling = True
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def insert(self, ts, typ, title=None, detail=None, duration=0, open_until=None):
+        """
+        Enfileira um novo evento. Nunca bloqueia no SQLite.
+        Com open_until, o evento fica marcado como intervalo aberto até esse ts.
+        """
+        event = PendingEvent()
+        self._put("insert", event, (int(ts), typ, title, detail, int(duration)))
+        if open_until is not None:
+            self._put("interval", event, int(open_until))
+        return event
+
+    def update_duration(self, event, duration):
+        """Enfileira a duração de um evento (PendingEvent ou id já gravado)"""
+        self._put("duration", event, int(duration))
+
+    def checkpoint(self, event, duration, open_until=None):
+        """Grava a duração de um intervalo; open_until=None fecha o intervalo"""
+        self._put("duration", event, int(duration))
+        self._put("interval", event, open_until)
+
+    def flush(self, timeout=None):
+        """Grava imediatamente tudo que já está na fila e espera o commit"""
+        marker = _Control()
+        self._put_control(marker)
+        return marker.done.wait(timeout)
+
+    def stop(self, timeout=10):
+        """Grava o que falta (no banco ou no journal) e encerra a thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        marker = _Control(stop=True)
+        self._put_control(marker)
+        marker.done.wait(timeout)
+        self._thread.join(timeout)
+
+    def _put(self, kind, ref, value):
+        with self._cond:
+            op = (next(self._seq), kind, ref, value)
+            if len(self._buffer) < self.max_buffer:
+                self._buffer.append(op)
+                self._cond.notify()
+                return
+            # Buffer cheio com o banco travado: tudo que está na memória vai
+            # para o journal, e a thread continua transbordando até o replay
+            spilled = [item for item in self._buffer if not isinstance(item, _Control)]
+            spilled.append(op)
+            self._buffer = deque(item for item in self._buffer if isinstance(item, _Control))
+            self._spilling = True
+            self._spill_pending += 1
+        logging.warning(f"Writer buffer full, spilling {len(spilled)} operations to {self.spill_path}")
+        self._journal_append(spilled)
+
+    def _put_control(self, marker):
+        with self._cond:
+            self._buffer.append(marker)
+            self._cond.notify()
+
+    def _next_batch(self):
+        """Próximo lote do buffer e se ele deve ir para o journal"""
+        with self._cond:
+            while not self._buffer:
+                timeout = SPILL_RETRY_SEC if self._spilling else None
+                if not self._cond.wait(timeout) and self._spilling:
+                    # Nada novo, mas há journal esperando replay
+                    return [], True
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            while len(batch) < self.max_batch:
+                if self._buffer:
+                    item = self._buffer.popleft()
+                    batch.append(item)
+                    if isinstance(item, _Control):
+                        break
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return batch, self._spilling
+
+    def _run(self):
+        if self._spilling:
+            self._replay()
+        while True:
+            batch, spilling = self._next_batch()
+            ops = [op for op in batch if not isinstance(op, _Control)]
+            if ops:
+                if spilling:
+                    self._spill(ops)
+                else:
+                    self._commit(ops)
+
+            control = batch[-1] if batch and isinstance(batch[-1], _Control) else None
+            if self._spilling and (control or time.monotonic() >= self._next_replay):
+                self._replay()
+            if control:
+                control.done.set()
+                if control.stop:
+                    return
+
+    def _commit(self, ops):
+        try:
+            inserted = self._apply(ops)
+        except sqlite3.OperationalError as e:
+            # Banco travado ou indisponível: nada se perde, vai para o journal
+            logging.error(f"Writer commit failed ({e}), spilling {len(ops)} operations")
+            self._spill(ops)
+            return
+        except Exception as e:
+            # Operação inválida: regrava uma a uma e descarta só a que falhar,
+            # para não perder os eventos dos outros produtores no mesmo lote
+            logging.error(f"Writer commit failed ({e}), retrying {len(ops)} operations one by one")
+            inserted = []
+            for i, op in enumerate(ops):
+                try:
+                    inserted.extend(self._apply([op]))
+                except sqlite3.OperationalError as e:
+                    logging.error(f"Writer commit failed ({e}), spilling {len(ops) - i} operations")
+                    self._spill(ops[i:])
+                    break
+                except Exception as e:
+                    logging.error(f"Dropping {op[1]} operation: {e}")
+                    if op[1] == "insert":
+                        inserted.append(op[2])
+        for event in inserted:
+            event._done.set()
+
+    def _apply(self, ops):
+        """Grava as operações (em ordem de seq) numa transação; devolve os inserts"""
+        # Só a última duração de cada evento importa dentro do lote
+        durations = {}
+        intervals = {}
+        for _, kind, ref, value in ops:
+            if kind == "duration":
+                durations[ref] = value
+            elif kind == "interval":
+                intervals[ref] = value
+
+        inserts = []
+        for _, kind, ref, row in ops:
+            if kind == "insert":
+                if ref in durations:
+                    # Insert e update no mesmo lote viram um único INSERT
+                    row = row[:4] + (durations.pop(ref),)
+                inserts.append((ref, row))
+
+        try:
+            with conn() as c:
+                for event, row in inserts:
+                    event.id = insert_event_row(c, *row)
+                updates = []
+                for ref, dur in durations.items():
+                    event_id = _resolve(ref)
+                    if event_id is not None:
+                        updates.append((dur, event_id))
+                c.executemany("UPDATE event_rows SET duration = ? WHERE id = ?", updates)
+
+                opened, closed = [], []
+                for ref, until in intervals.items():
+                    event_id = _resolve(ref)
+                    if event_id is None:
+                        continue
+                    if until is None:
+                        closed.append((event_id,))
+                    else:
+                        opened.append((event_id, until))
+                c.executemany(
+                    "INSERT OR REPLACE INTO open_intervals (event_id, expires_ts) VALUES (?, ?)",
+                    opened
+                )
+                c.executemany("DELETE FROM open_intervals WHERE event_id = ?", closed)
+        except BaseException:
+            for event, _ in inserts:
+                event.id = None
+            raise
+        return [event for event, _ in inserts]
+
+    def _spill(self, ops):
+        with self._cond:
+            self._spilling = True
+            self._spill_pending += 1
+        self._journal_append(ops)
+
+    def _journal_append(self, ops):
+        try:
+            with self._journal_lock:
+                lines = []
+                for seq, kind, ref, value in ops:
+                    entry = {"seq": seq, "op": kind, "value": value}
+                    event_id = _resolve(ref)
+                    if event_id is not None:
+                        entry["id"] = event_id
+                    else:
+                        entry["ref"] = ref.ref
+                        self._spill_refs[ref.ref] = ref
+                    lines.append(json.dumps(entry, ensure_ascii=False))
+                # Uma escrita só por lote: um crash deixa no máximo a última linha incompleta
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            logging.error(f"Could not write spill journal, dropping {len(ops)} operations: {e}")
+        finally:
+            with self._cond:
+                self._spill_pending -= 1
+
+    def _journal_last_seq(self):
+        try:
+            with open(self.spill_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        last = None
+        for line in data.splitlines():
+            try:
+                last = max(last or 0, json.loads(line)["seq"])
+            except (ValueError, KeyError):
+                continue
+        return last
+
+    def _replay(self):
+        """Reaplica o journal no banco; em caso de falha tenta de novo depois"""
+        with self._journal_lock:
+            try:
+                with open(self.spill_path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b""
+            live = dict(self._spill_refs)
+
+        ops = []
+        placeholders = {}
+        for line in data.splitlines():
+            try:
+                entry = json.loads(line)
+                if "id" in entry:
+                    ref = entry["id"]
+                else:
+                    # Evento desta execução (objeto vivo) ou de uma anterior
+                    ref = live.get(entry["ref"]) or placeholders.setdefault(
+                        entry["ref"], PendingEvent(entry["ref"])
+                    )
+                value = tuple(entry["value"]) if entry["op"] == "insert" else entry["value"]
+                ops.append((entry["seq"], entry["op"], ref, value))
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Skipping corrupt spill journal line: {e}")
+        ops.sort(key=lambda op: op[0])
+
+        inserted = []
+        if ops:
+            try:
+                inserted = self._apply(ops)
+            except sqlite3.OperationalError as e:
+                logging.warning(f"Spill journal replay failed ({e}), retrying in {SPILL_RETRY_SEC}s")
+                self._next_replay = time.monotonic() + SPILL_RETRY_SEC
+                return
+            except Exception as e:
+                logging.error(f"Spill journal replay failed: {e}")
+                logging.error(f"Dropping {len(ops)} spilled operations")
+                inserted = [ref for _, kind, ref, _ in ops if kind == "insert"]
+            logging.info(f"Replayed {len(ops)} operations from {self.spill_path}")
+
+        with self._cond:
+            with self._journal_lock:
+                # Mantém só o que foi anexado enquanto o replay gravava
+                try:
+                    with open(self.spill_path, "r+b") as f:
+                        f.seek(len(data))
+                        tail = f.read()
+                        f.seek(0)
+                        f.write(tail)
+                        f.truncate()
+                except FileNotFoundError:
+                    tail = b""
+                if not tail and self._spill_pending == 0:
+                    self._spilling = False
+                    self._spill_refs.clear()
+                    try:
+                        os.remove(self.spill_path)
+                    except FileNotFoundError:
+                        pass
+                else:
+                    self._next_replay = 0.0
+
+        for event in inserted:
+            event._done.set()
+
+
+def _resolve(ref):
+    return ref.id if isinstance(ref, PendingEvent) else ref
+
+
+_writers = {}
+_writer_lock = threading.Lock()
+
+
+def get_writer(name="default"):
+    """
+    Writer compartilhado do processo, iniciado no primeiro uso. Cada nome
+    tem seu próprio journal, então agente e API não reaplicam o do outro.
+    """
+    with _writer_lock:
+        writer = _writers.get(name)
+        if writer is None:
+            writer = _writers[name] = EventWriter(name).start()
+            atexit.register(writer.stop)
+        return writer
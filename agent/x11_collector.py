@@ -0,0 +1,164 @@
+# agent/x11_collector.py
+"""
+Coletor nativo de janela ativa para X11.
+
+Mantém uma conexão X aberta e assina PropertyNotify de _NET_ACTIVE_WINDOW
+(na raiz) e _NET_WM_NAME/WM_NAME (na janela focada), então cada troca é
+registrada no momento em que acontece, sem criar processos. O tempo ocioso
+vem da extensão MIT-SCREEN-SAVER.
+
+Cada troca é entregue ao callback `on_change(ts, título, pid, window id)`,
+chamado na thread do coletor.
+
+Requer python-xlib (pip install python-xlib). Sem ele, ou sem $DISPLAY,
+X11Collector.create() devolve None e o agente usa xdotool/xprintidle.
+"""
+import logging
+import threading
+import time
+
+try:
+    from Xlib import X, display as xdisplay, error as xerror
+    from Xlib.ext import screensaver  # noqa: F401 - registra screensaver_query_info
+except ImportError:  # python-xlib é opcional
+    xdisplay = None
+
+
+class X11Collector:
+    def __init__(self, on_change):
+        # Uma conexão bloqueia em next_event(); a outra atende consultas
+        self._events = xdisplay.Display()
+        self._queries = xdisplay.Display()
+        self._root = self._events.screen().root
+        self._atom = {
+            name: self._events.intern_atom(name)
+            for name in ("_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "WM_NAME", "UTF8_STRING", "_NET_WM_PID")
+        }
+        self._has_screensaver = self._queries.has_extension("MIT-SCREEN-SAVER")
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._query_lock = threading.Lock()
+        self._active = None
+        self._current = ("unknown", None, None)
+        self._running = False
+        self._thread = None
+
+    @classmethod
+    def create(cls, on_change):
+        """Coletor pronto para uso, ou None se X11/python-xlib não estiverem disponíveis"""
+        if xdisplay is None:
+            logging.info("python-xlib not installed, using xdotool fallback")
+            return None
+        try:
+            return cls(on_change)
+        except Exception as e:
+            logging.info(f"X11 collector unavailable ({e}), using xdotool fallback")
+            return None
+
+    def start(self):
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._events.flush()
+        self._switch_to(self._active_window(), time.time())
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="x11-collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        for d in (self._events, self._queries):
+            try:
+                d.close()
+            except Exception:
+                pass
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def current(self):
+        """(título, pid, window id) da janela focada agora"""
+        with self._lock:
+            return self._current
+
+    def idle_seconds(self):
+        """Tempo desde a última entrada do usuário (XScreenSaverQueryInfo)"""
+        if not self._has_screensaver:
+            return 0
+        with self._query_lock:
+            info = self._queries.screen().root.screensaver_query_info()
+        return info.idle / 1000.0
+
+    def _run(self):
+        while self._running:
+            try:
+                event = self._events.next_event()
+            except Exception as e:
+                if self._running:
+                    logging.error(f"X11 event loop failed: {e}")
+                return
+            if event.type != X.PropertyNotify:
+                continue
+            now = time.time()
+            if event.window == self._root:
+                if event.atom == self._atom["_NET_ACTIVE_WINDOW"]:
+                    self._switch_to(self._active_window(), now)
+            elif self._active is not None and event.window.id == self._active.id:
+                if event.atom in (self._atom["_NET_WM_NAME"], self._atom["WM_NAME"]):
+                    self._record(now, self._title(self._active), self._current[1], self._active.id)
+
+    def _active_window(self):
+        try:
+            prop = self._root.get_full_property(self._atom["_NET_ACTIVE_WINDOW"], X.AnyPropertyType)
+            if prop and prop.value and prop.value[0]:
+                return self._events.create_resource_object("window", prop.value[0])
+        except xerror.XError:
+            pass
+        return None
+
+    def _switch_to(self, window, ts):
+        # Troca a assinatura de mudança de título para a nova janela focada
+        if self._active is not None:
+            try:
+                self._active.change_attributes(event_mask=X.NoEventMask)
+            except xerror.XError:
+                pass
+        self._active = window
+        if window is None:
+            self._record(ts, "unknown", None, None)
+            return
+        try:
+            window.change_attributes(event_mask=X.PropertyChangeMask)
+            self._events.flush()
+        except xerror.XError:
+            pass
+        self._record(ts, self._title(window), self._pid(window), window.id)
+
+    def _title(self, window):
+        try:
+            prop = window.get_full_property(self._atom["_NET_WM_NAME"], self._atom["UTF8_STRING"])
+            if prop and prop.value:
+                value = prop.value
+                return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+            name = window.get_wm_name()
+            if name:
+                return name.decode("latin-1") if isinstance(name, bytes) else name
+        except xerror.XError:
+            pass
+        return "unknown"
+
+    def _pid(self, window):
+        try:
+            prop = window.get_full_property(self._atom["_NET_WM_PID"], X.AnyPropertyType)
+            if prop and prop.value:
+                return int(prop.value[0])
+        except xerror.XError:
+            pass
+        return None
+
+    def _record(self, ts, title, pid, window_id):
+        with self._lock:
+            if (title, pid, window_id) == self._current:
+                return
+            self._current = (title, pid, window_id)
+        self._on_change(int(ts), title, pid, window_id)
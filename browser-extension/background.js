@@ -1,33 +1,67 @@
 // background.js - ActivityTracker Browser Extension (Manifest V3)
-const API_URL = "http://localhost:5001/api/log_event";
+const API_URL = "http://localhost:5001/api/log_events";
+const FLUSH_DELAY_MS = 5000;   // espera até 5s juntando eventos
+const FLUSH_MAX_EVENTS = 50;   // ou envia assim que juntar 50
+const MAX_PENDING = 1000;      // limite do buffer se a API estiver offline
 let currentTab = null;
 let tabStartTime = {};
 let tabInfo = {};
+let pendingEvents = [];
+let flushTimer = null;
 
 // Compatibilidade Chrome/Firefox
 const browserAPI = typeof chrome !== 'undefined' ? chrome : browser;
 
-// Envia evento para a API
-async function logEvent(type, title, detail, duration = 0) {
+// Envia o buffer de eventos para a API em uma única requisição
+async function flushEvents() {
+  if (flushTimer !== null) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+  if (pendingEvents.length === 0) {
+    return;
+  }
+  
+  const batch = pendingEvents;
+  pendingEvents = [];
   try {
-    const data = {
-      ts: Math.floor(Date.now() / 1000),
-      type: type,
-      title: title,
-      detail: detail,
-      duration: duration
-    };
-    
-    await fetch(API_URL, {
+    const res = await fetch(API_URL, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(data)
+      body: JSON.stringify(batch)
     });
-    
-    console.log("Event logged:", data);
+    if (!res.ok) {
+      throw new Error(`HTTP ${res.status}`);
+    }
+    console.log(`Logged ${batch.length} events`);
   } catch (error) {
-    console.error("Failed to log event:", error);
-    // Não falha silenciosamente - API pode estar offline
+    console.error("Failed to log events:", error);
+    // API pode estar offline: devolve ao buffer para a próxima tentativa
+    pendingEvents = batch.concat(pendingEvents).slice(-MAX_PENDING);
+    scheduleFlush();
+  }
+}
+
+function scheduleFlush() {
+  if (flushTimer === null) {
+    flushTimer = setTimeout(flushEvents, FLUSH_DELAY_MS);
+  }
+}
+
+// Enfileira evento para a API
+function logEvent(type, title, detail, duration = 0) {
+  pendingEvents.push({
+    ts: Math.floor(Date.now() / 1000),
+    type: type,
+    title: title,
+    detail: detail,
+    duration: duration
+  });
+  
+  if (pendingEvents.length >= FLUSH_MAX_EVENTS) {
+    flushEvents();
+  } else {
+    scheduleFlush();
   }
 }
 
@@ -134,6 +168,7 @@ if (browserAPI.runtime.onSuspend) {
     if (currentTab !== null) {
       recordTabTime(currentTab);
     }
+    flushEvents();
   });
 }
 
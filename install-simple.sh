@@ -123,7 +123,7 @@ After=network.target
 [Service]
 Type=simple
 WorkingDirectory=$INSTALL_DIR/agent
-ExecStart=$INSTALL_DIR/venv/bin/python3 $INSTALL_DIR/agent/api.py
+ExecStart=$INSTALL_DIR/venv/bin/python3 $INSTALL_DIR/agent/serve.py
 Restart=always
 RestartSec=10
 
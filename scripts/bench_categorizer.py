@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# scripts/bench_categorizer.py - Mede a categorização de um mês de eventos
+"""
+Uso: python3 scripts/bench_categorizer.py [--events 90000] [--titles 500]
+
+Gera um mês sintético (os mesmos poucos títulos repetidos, como no uso
+real) e compara o laço antigo (todas as palavras de todas as categorias,
+com lower() a cada evento) com o agent/categorizer.py: o mesmo laço por
+texto, sem e com o memo LRU. Não lê o banco nem o ~/.activity_tracker/categories.json.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agent"))
+
+from categorizer import DEFAULT_RULES, Categorizer  # noqa: E402
+
+APPS = ["Visual Studio Code", "YouTube", "Google Chrome", "Slack", "Terminal", "Firefox", "Documento"]
+
+
+def legacy(typ, title, detail):
+    # Como era: any() sobre cada lista, re-fazendo lower() a cada chamada
+    title_lower = title.lower()
+    detail_lower = detail.lower()
+    if typ == "idle" or "ocioso" in title_lower:
+        return "idle"
+    for category, words in DEFAULT_RULES.items():
+        if any(word in title_lower or word in detail_lower for word in words):
+            return category
+    return "other"
+
+
+def bench(name, fn, events):
+    t0 = time.perf_counter()
+    result = [fn(*e) for e in events]
+    print(f"{name:<22} {(time.perf_counter() - t0) * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o categorizador antigo e o com memo")
+    parser.add_argument("--events", type=int, default=90000, help="eventos (~1 mês de uso)")
+    parser.add_argument("--titles", type=int, default=500, help="títulos distintos")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = [w for ws in DEFAULT_RULES.values() for w in ws] + ["projeto", "relatório", "ocioso"]
+    titles = [f"{rng.choice(words).title()} {i} - {rng.choice(APPS)}" for i in range(args.titles)]
+    events = [
+        (rng.choice(("window", "window", "website", "terminal", "idle")), rng.choice(titles), f"pid:{rng.randint(1, 9)}")
+        for _ in range(args.events)
+    ]
+    print(f"{len(events)} eventos, {len(titles)} títulos distintos\n")
+
+    expected = bench("laço antigo", legacy, events)
+    no_memo = Categorizer(memo_size=0)
+    assert bench("laço por texto", no_memo.categorize, events) == expected
+    engine = Categorizer()
+    assert bench("laço por texto + LRU", engine.categorize, events) == expected
+    info = engine.cache_info()
+    print(f"\nmemo: {info.hits} acertos, {info.misses} falhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# scripts/bench_db.py - Compara abrir/fechar conexão por chamada com o pool persistente
+"""
+Uso: python3 scripts/bench_db.py [--ops 2000] [--keep]
+
+Roda contra um banco temporário (nunca toca em ~/.activity_tracker) e
+mostra operações por segundo de insert, update e fetch nos dois modos.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp(prefix="at-bench-")
+os.environ["ACTIVITY_TRACKER_DB"] = os.path.join(TMP_DIR, "pooled.db")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agent"))
+
+import db  # noqa: E402
+
+LEGACY_PATH = os.path.join(TMP_DIR, "legacy.db")
+LEGACY_SCHEMA = """
+CREATE TABLE events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    title TEXT,
+    detail TEXT,
+    duration INTEGER DEFAULT 0
+);
+CREATE INDEX idx_ts ON events(ts);
+"""
+_legacy_lock = threading.Lock()
+
+
+@contextmanager
+def legacy_conn():
+    # Comportamento antigo: lock global + connect/commit/close por chamada
+    with _legacy_lock:
+        con = sqlite3.connect(LEGACY_PATH, timeout=30)
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+
+
+def legacy_insert(ts, typ, title=None, detail=None, duration=0):
+    with legacy_conn() as c:
+        cur = c.execute(
+            "INSERT INTO events (ts, type, title, detail, duration) VALUES (?, ?, ?, ?, ?)",
+            (int(ts), typ, title, detail, int(duration))
+        )
+        return cur.lastrowid
+
+
+def legacy_update(event_id, duration):
+    with legacy_conn() as c:
+        c.execute("UPDATE events SET duration = ? WHERE id = ?", (int(duration), event_id))
+
+
+def legacy_fetch(start_ts=None, end_ts=None, limit=1000):
+    with legacy_conn() as c:
+        return c.execute(
+            "SELECT id, ts, type, title, detail, duration FROM events "
+            "WHERE ts >= ? AND ts <= ? ORDER BY ts ASC LIMIT ?",
+            (start_ts, end_ts, limit)
+        ).fetchall()
+
+
+def bench(fn, ops):
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return ops / elapsed if elapsed else float("inf")
+
+
+def run(impl, ops):
+    insert, update, fetch = impl
+    base = int(time.time())
+    ids = []
+    results = {}
+    results["insert"] = bench(
+        lambda i: ids.append(insert(base + i, "window", f"Janela {i % 50}", f"pid:{i}")), ops
+    )
+    results["update"] = bench(lambda i: update(ids[i], i), ops)
+    results["fetch"] = bench(lambda i: fetch(base, base + ops, 100), ops)
+    return results
+
+
+def bench_all(args):
+    # Corpo do benchmark; main() cuida dos bancos temporários
+    with legacy_conn() as c:
+        c.executescript(LEGACY_SCHEMA)
+    db.init_db()
+
+    before = run((legacy_insert, legacy_update, legacy_fetch), args.ops)
+    after = run((db.insert_event, db.update_last_event_duration, db.fetch_events), args.ops)
+
+    print(f"{'operação':<10} {'antes (ops/s)':>15} {'depois (ops/s)':>15} {'ganho':>8}")
+    for op in ("insert", "update", "fetch"):
+        print(f"{op:<10} {before[op]:>15,.0f} {after[op]:>15,.0f} {after[op] / before[op]:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000, help="operações por teste")
+    parser.add_argument("--keep", action="store_true", help="mantém os bancos temporários para inspeção")
+    args = parser.parse_args()
+    try:
+        bench_all(args)
+    finally:
+        if args.keep:
+            print(f"\nBancos temporários em: {TMP_DIR}")
+        else:
+            db.close_pool()
+            shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# scripts/bench_formats.py - Compara os formatos de resposta de /api/events
+"""
+Uso: python3 scripts/bench_formats.py [--rows 50000] [--repeat 5] [--keep]
+
+Roda contra um banco temporário (nunca toca em ~/.activity_tracker): grava
+eventos sintéticos, lê uma página com fetch_events e mede o tempo de
+codificação e o tamanho (cru e gzip) de cada formato, incluindo o caminho
+antigo (dict por linha + json.dumps com chaves ordenadas, como o jsonify).
+Formatos sem a dependência instalada aparecem como "indisponível".
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp(prefix="at-bench-")
+os.environ["ACTIVITY_TRACKER_DB"] = os.path.join(TMP_DIR, "formats.db")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agent"))
+
+import db  # noqa: E402
+import encoders  # noqa: E402
+
+TITLES = [f"Projeto {i} — Visual Studio Code" for i in range(50)] + [f"Issue #{i} · GitHub" for i in range(200)]
+
+
+def legacy_json(rows, next_cursor):
+    # Como era: um dict por linha e jsonify (json.dumps com sort_keys)
+    events = [
+        {"id": r[0], "ts": r[1], "type": r[2], "title": r[3], "detail": r[4], "duration": r[5]}
+        for r in rows
+    ]
+    return json.dumps({"events": events, "next_cursor": next_cursor}, sort_keys=True).encode("utf-8")
+
+
+def populate(n):
+    rng = random.Random(42)
+    ts = int(time.time()) - n * 5
+    rows = []
+    for _ in range(n):
+        ts += rng.randint(1, 10)
+        typ = rng.choice(("window", "window", "website", "terminal"))
+        rows.append((ts, typ, rng.choice(TITLES), f"pid:{rng.randint(1000, 9999)} exe:/usr/bin/code", rng.randint(0, 600)))
+    for i in range(0, n, 5000):
+        db.insert_events(rows[i:i + 5000])
+
+
+def bench(name, fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn(rows, "0:0")
+        best = min(best, time.perf_counter() - t0)
+    return name, best * 1000, len(body), len(gzip.compress(body, 6))
+
+
+def bench_all(args):
+    # Corpo do benchmark; main() cuida dos bancos temporários
+    db.init_db()
+    populate(args.rows)
+    rows = db.fetch_events(limit=args.rows)
+    print(f"{len(rows)} eventos; orjson: {'sim' if encoders.orjson else 'não'}\n")
+
+    candidates = [("json (antigo)", legacy_json)]
+    candidates += [(fmt, encoders.ENCODERS[fmt]) for fmt in encoders.ENCODERS]
+    print(f"{'formato':<16} {'codificação':>12} {'tamanho':>12} {'gzip':>12}")
+    for name, fn in candidates:
+        fmt = name.split()[0]
+        if not encoders.available(fmt):
+            print(f"{name:<16} {'indisponível':>12}")
+            continue
+        name, ms, size, gz = bench(name, fn, rows, args.repeat)
+        print(f"{name:<16} {ms:>9.1f} ms {size / 1024:>9.0f} KB {gz / 1024:>9.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara formatos de /api/events")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5, help="melhor de N execuções")
+    parser.add_argument("--keep", action="store_true", help="mantém os bancos temporários para inspeção")
+    args = parser.parse_args()
+    try:
+        bench_all(args)
+    finally:
+        if args.keep:
+            print(f"\nBancos temporários em: {TMP_DIR}")
+        else:
+            db.close_pool()
+            shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
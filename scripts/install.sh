@@ -87,7 +87,7 @@ After=network.target
 Type=simple
 User=$USER
 WorkingDirectory=$INSTALL_DIR/agent
-ExecStart=$INSTALL_DIR/venv/bin/python3 $INSTALL_DIR/agent/api.py
+ExecStart=$INSTALL_DIR/venv/bin/python3 $INSTALL_DIR/agent/serve.py
 Restart=on-failure
 RestartSec=10
 
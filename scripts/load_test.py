@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# scripts/load_test.py - Carga concorrente na API com conexões keep-alive
+"""
+Uso: python3 scripts/load_test.py [--concurrency 16] [--duration 10] [--threads 8]
+     python3 scripts/load_test.py --url http://127.0.0.1:5001   (API já rodando)
+
+Por padrão sobe o próprio serve.py numa porta livre, com um banco e um HOME
+temporários apagados no fim: o histórico real nunca é tocado. --url ou
+--unix-socket medem uma API já rodando; nesse caso os eventos gravados
+(type=loadtest) ficam no banco dela.
+
+Cada worker mantém uma conexão HTTP/1.1 aberta e repete a requisição até o
+tempo acabar. Mostra requisições por segundo e latências p50/p99 de
+POST /api/log_event e GET /api/stats.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+SERVE_PY = Path(__file__).resolve().parent.parent / "agent" / "serve.py"
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=10):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def make_connection(args):
+    if args.unix_socket:
+        return UnixHTTPConnection(args.unix_socket)
+    url = urlparse(args.url)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+
+
+def request_log_event(conn, i):
+    body = json.dumps({"type": "loadtest", "title": f"load {i % 20}", "detail": "", "duration": 0})
+    conn.request("POST", "/api/log_event", body, {"Content-Type": "application/json"})
+
+
+def request_stats(conn, i):
+    conn.request("GET", "/api/stats")
+
+
+def worker(args, send, deadline, latencies, errors):
+    conn = make_connection(args)
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            send(conn, i)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors.append(resp.status)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = make_connection(args)
+        i += 1
+    conn.close()
+
+
+def run(args, name, send):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args, send, deadline, latencies, errors))
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+    print(
+        f"{name:<22} {len(latencies) / elapsed:>9,.0f} req/s  "
+        f"p50 {pct(0.50):>7.2f} ms  p99 {pct(0.99):>7.2f} ms  erros {len(errors)}"
+    )
+
+
+@contextmanager
+def throwaway_server(threads):
+    """serve.py numa porta livre, com banco e HOME temporários; devolve a URL"""
+    tmp = tempfile.mkdtemp(prefix="at-load-")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, HOME=tmp, ACTIVITY_TRACKER_DB=os.path.join(tmp, "load.db"))
+    proc = subprocess.Popen(
+        [sys.executable, str(SERVE_PY), "--host", "127.0.0.1", "--port", str(port), "--threads", str(threads)],
+        cwd=SERVE_PY.parent, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if proc.poll() is not None:
+                sys.exit(f"serve.py exited with code {proc.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    sys.exit("serve.py did not start listening in 30s")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="API já rodando (grava eventos type=loadtest no banco dela)")
+    parser.add_argument("--unix-socket", help="socket Unix de um serve.py já rodando (ignora --url)")
+    parser.add_argument("--threads", type=int, default=8, help="threads do serve.py temporário")
+    parser.add_argument("--concurrency", type=int, default=16, help="conexões simultâneas")
+    parser.add_argument("--duration", type=float, default=10, help="segundos por endpoint")
+    args = parser.parse_args()
+
+    def measure():
+        print(f"concorrência {args.concurrency}, {args.duration:.0f}s por endpoint")
+        run(args, "POST /api/log_event", request_log_event)
+        run(args, "GET /api/stats", request_stats)
+
+    if args.url or args.unix_socket:
+        print(f"ATENÇÃO: eventos type=loadtest serão gravados em {args.unix_socket or args.url}")
+        measure()
+        return
+    with throwaway_server(args.threads) as url:
+        args.url = url
+        print(f"serve.py temporário em {url} ({args.threads} threads, banco descartável)")
+        measure()
+
+
+if __name__ == "__main__":
+    main()
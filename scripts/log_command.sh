@@ -2,41 +2,67 @@
 # >> activity-tracker shell hook
 # Adicione ao final do ~/.bashrc ou ~/.zshrc:
 # source /caminho/para/log_command.sh
+#
+# Cada comando vai para o socket Unix do agente (0600, só o próprio usuário),
+# sem criar processos por comando: zsh usa zsocket; o bash não abre sockets
+# Unix, então escreve num fd ligado a um encaminhador (shell_forward.py)
+# iniciado uma vez por shell. Com o agente parado, os comandos ficam no
+# term_history.log e são importados quando ele voltar.
+# Linha entregue: "ts|host|comando"
 
-function _at_log_command() {
-  local EXIT=$?
-  local CMD=$(history 1 | sed 's/^ *[0-9]* *//')
-  
-  # Ignora comandos vazios ou muito pequenos
-  if [ -z "$CMD" ] || [ ${#CMD} -lt 2 ]; then
-    return $EXIT
-  fi
-  
-  # Cria diretório se não existir
-  mkdir -p ~/.activity_tracker
-  
-  # Escreve no arquivo local
-  echo "$(date +%s)|terminal|${CMD}" >> ~/.activity_tracker/term_history.log
-  
-  # Envia para API (em background, sem bloquear o terminal)
-  (
-    curl -s -X POST http://localhost:5001/api/log_event \
-      -H "Content-Type: application/json" \
-      -d "{\"ts\":$(date +%s),\"type\":\"terminal\",\"title\":\"$(hostname)\",\"detail\":\"${CMD//\"/\\\"}\"}" \
-      >/dev/null 2>&1 &
-  )
-  
-  return $EXIT
-}
+AT_SOCKET="${AT_SOCKET:-$HOME/.activity_tracker/ingest.sock}"
+AT_HISTORY="${AT_HISTORY:-$HOME/.activity_tracker/term_history.log}"
 
 # Para bash
 if [ -n "$BASH_VERSION" ]; then
+  _at_last_histcmd=
+  _at_dir="${BASH_SOURCE[0]%/*}"
+  [[ "$_at_dir" == "${BASH_SOURCE[0]}" ]] && _at_dir=.
+  _at_fd=
+  _at_pid=
+  if command -v python3 >/dev/null 2>&1; then
+    exec {_at_fd}> >(exec python3 "$_at_dir/shell_forward.py" "$AT_SOCKET" "$AT_HISTORY" 2>/dev/null)
+    _at_pid=$!
+  fi
+  function _at_log_command() {
+    local EXIT=$?
+    # HISTCMD só muda quando um comando novo entra no histórico (Enter vazio não conta)
+    if [[ "$HISTCMD" != "$_at_last_histcmd" ]]; then
+      if [[ -n "$_at_last_histcmd" ]]; then
+        # `history` é builtin: com HISTTIMEFORMAT a saída já é "N  ts|host|comando",
+        # com as linhas de continuação abaixo; o NUL fecha o registro
+        if [[ -n "$_at_pid" ]] && kill -0 "$_at_pid" 2>/dev/null; then
+          { HISTTIMEFORMAT="%s|${HOSTNAME}|" builtin history 1; printf '\0'; } 2>/dev/null >&"$_at_fd"
+        else
+          # Sem encaminhador (escrever num pipe sem leitor mataria o shell):
+          # direto no arquivo; a importação junta as linhas de continuação
+          HISTTIMEFORMAT="%s|${HOSTNAME}|" builtin history 1 2>/dev/null >> "$AT_HISTORY"
+        fi
+      fi
+      _at_last_histcmd=$HISTCMD
+    fi
+    return $EXIT
+  }
   export PROMPT_COMMAND="_at_log_command; $PROMPT_COMMAND"
 fi
 
 # Para zsh
 if [ -n "$ZSH_VERSION" ]; then
-  precmd_functions+=(_at_log_command)
+  zmodload zsh/datetime zsh/net/socket 2>/dev/null
+  function _at_log_command() {
+    # preexec recebe a linha digitada em $1
+    local cmd=${1//$'\n'/ }
+    [[ ${#cmd} -lt 2 ]] && return
+    local line="${EPOCHSECONDS}|${HOST}|${cmd}"
+    if zsocket "$AT_SOCKET" 2>/dev/null; then
+      print -r -u $REPLY -- "$line"
+      exec {REPLY}>&-
+    else
+      # Agente parado: fica no arquivo e é importado quando ele voltar
+      print -r -- "$line" 2>/dev/null >> "$AT_HISTORY"
+    fi
+  }
+  preexec_functions+=(_at_log_command)
 fi
 
 echo "ActivityTracker shell hook loaded"
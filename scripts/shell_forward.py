@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# scripts/shell_forward.py - Entrega os comandos do bash ao agente
+"""
+Uso (pelo hook log_command.sh, um processo por shell e não por comando):
+    python3 shell_forward.py SOCKET HISTORY_LOG < fd do bash
+
+O bash não abre sockets Unix, então o hook escreve cada comando num fd
+ligado a este processo: a saída de `history 1` seguida de um NUL. As linhas
+de continuação de um comando com várias linhas são juntadas com espaço, e
+o registro vira uma linha "N  ts|host|comando" entregue ao socket Unix do
+agente (0600, só o próprio usuário). Com o agente parado, a linha vai para
+o term_history.log, importado quando ele voltar.
+"""
+import os
+import socket
+import sys
+
+
+def deliver(socket_path, history_path, line):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(socket_path)
+            s.sendall(line)
+    except OSError:
+        with open(history_path, "ab") as f:
+            f.write(line)
+
+
+def main():
+    socket_path, history_path = sys.argv[1:3]
+    buf = b""
+    while True:
+        chunk = os.read(0, 65536)
+        if not chunk:
+            break   # shell fechou o fd ao sair
+        buf += chunk
+        *records, buf = buf.split(b"\0")
+        for record in records:
+            line = b" ".join(part.strip() for part in record.strip(b"\n").split(b"\n"))
+            if line:
+                deliver(socket_path, history_path, line + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -61,6 +61,14 @@ test_component "keyboard_monitor.py" "python3 -m py_compile keyboard_monitor.py"
 test_component "ai_summarizer.py" "python3 -m py_compile ai_summarizer.py"
 echo ""
 
+# Regressão de desempenho: consultas quentes devem continuar usando índices
+echo "4b. Verificando planos de consulta (EXPLAIN QUERY PLAN):"
+# Banco temporário: check-plans roda init_db() e migraria o banco real
+PLAN_DB_DIR=$(mktemp -d)
+test_component "índices em uso" "ACTIVITY_TRACKER_DB=$PLAN_DB_DIR/plans.db python3 maintenance.py check-plans"
+rm -rf "$PLAN_DB_DIR"
+echo ""
+
 # Testa serviços systemd
 echo "5. Verificando serviços systemd:"
 test_component "activity-tracker-agent.service" "test -f ~/.config/systemd/user/activity-tracker-agent.service"